@@ -6,13 +6,23 @@ class Settings(BaseSettings):
     TELEGRAM_API_ID: int = 32794038
     TELEGRAM_API_HASH: str = "a6e36c2271ead721fcbb6e6a1b2ead09"
     TELEGRAM_SESSION_NAME: str = "spy_session"
+    # Comma-separated extra session names; each needs its own authorized
+    # session file. Empty means a single-session pool.
+    TELEGRAM_SESSION_NAMES: str = ""
     TELEGRAM_SESSION_DATA: str = ""
     ANTHROPIC_API_KEY: str = ""
+    REDIS_URL: str = ""
     SCRAPE_INTERVAL_MINUTES: int = 30
     MAX_MESSAGES_PER_SCRAPE: int = 100
     STATS_SNAPSHOT_HOUR: int = 23
     STATS_SNAPSHOT_MINUTE: int = 1
     FRONTEND_URL: str = "http://localhost:5173"
+    MEDIA_STORE_DIR: str = "static/thumbs"
+    # Public origin of this backend (e.g. https://backend.example.com),
+    # prefixed to stored media URLs. The frontend is served from a
+    # different origin, so relative /static paths would 404 there; leave
+    # empty only when a /static proxy fronts the API (vite dev server).
+    MEDIA_URL_BASE: str = ""
 
     class Config:
         env_file = ".env"
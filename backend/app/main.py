@@ -6,11 +6,15 @@ from datetime import datetime
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from fastapi_cache import FastAPICache
+from fastapi_cache.backends.inmemory import InMemoryBackend
 
 from app.config import settings
 from app.database import engine, Base
 from app.routers import channels, messages, stats, analysis, persona
 from app.services.scheduler import start_scheduler, stop_scheduler
+from app.services.telegram_client import shutdown_api_scraper
 
 # Configure logging
 logging.basicConfig(
@@ -64,6 +68,27 @@ async def lifespan(app: FastAPI):
                 "ALTER TABLE messages ADD COLUMN IF NOT EXISTS reactions_json TEXT",
                 "ALTER TABLE messages ADD COLUMN IF NOT EXISTS is_pinned BOOLEAN DEFAULT FALSE NOT NULL",
                 "ALTER TABLE messages ADD COLUMN IF NOT EXISTS forward_from VARCHAR(500)",
+                "CREATE INDEX IF NOT EXISTS ix_analysis_has_cta ON message_analysis (cta_type) "
+                "WHERE cta_type IS NOT NULL AND cta_type NOT IN ('', 'none')",
+                "CREATE INDEX IF NOT EXISTS messages_posted_views_idx ON messages (posted_at) "
+                "INCLUDE (views_count) WHERE posted_at IS NOT NULL",
+                "CREATE INDEX IF NOT EXISTS channel_stats_cid_rec_desc ON channel_stats "
+                "(channel_id, recorded_at DESC)",
+                "CREATE INDEX IF NOT EXISTS messages_with_links_idx ON messages "
+                "(channel_id) WHERE external_links IS NOT NULL AND external_links <> ''",
+                "CREATE INDEX IF NOT EXISTS ix_msg_chan_tgid ON messages "
+                "(channel_id, telegram_message_id DESC)",
+                "CREATE INDEX IF NOT EXISTS ix_msg_chan_ctype ON messages "
+                "(channel_id, content_type)",
+                "CREATE INDEX IF NOT EXISTS ix_msg_chan_posted ON messages "
+                "(channel_id, posted_at)",
+                # timezone('utc', now()): the columns are naive TIMESTAMP
+                # treated as UTC, and bare now() would be rendered in the
+                # server's local zone on non-UTC hosts
+                "ALTER TABLE messages ALTER COLUMN scraped_at "
+                "SET DEFAULT timezone('utc', now())",
+                "ALTER TABLE channel_stats ALTER COLUMN recorded_at "
+                "SET DEFAULT timezone('utc', now())",
             ]
             for sql in migrations:
                 conn.execute(text(sql))
@@ -72,6 +97,24 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         logger.warning(f"Schema migration note: {e}")
 
+    # Response cache for the heavy stats endpoints: Redis when configured,
+    # per-process in-memory backend otherwise
+    try:
+        if settings.REDIS_URL:
+            from redis import asyncio as aioredis
+            from fastapi_cache.backends.redis import RedisBackend
+
+            FastAPICache.init(
+                RedisBackend(aioredis.from_url(settings.REDIS_URL)),
+                prefix="stats",
+            )
+            logger.info("Response cache initialized (Redis backend).")
+        else:
+            FastAPICache.init(InMemoryBackend(), prefix="stats")
+            logger.info("Response cache initialized (in-memory backend).")
+    except Exception as e:
+        logger.error(f"Failed to initialize response cache: {e}")
+
     # Start the scheduler
     try:
         start_scheduler()
@@ -83,7 +126,8 @@ async def lifespan(app: FastAPI):
 
     # Shutdown
     logger.info("Shutting down Spy Affiliation Trading backend...")
-    stop_scheduler()
+    await stop_scheduler()
+    shutdown_api_scraper()
     logger.info("Application shutdown complete.")
 
 
@@ -99,6 +143,25 @@ app = FastAPI(
 )
 
 
+# Thumbnails saved by the media store are content-addressed (sha1 names),
+# so they can be cached forever on the client side
+os.makedirs(settings.MEDIA_STORE_DIR, exist_ok=True)
+app.mount(
+    "/static/thumbs",
+    StaticFiles(directory=settings.MEDIA_STORE_DIR),
+    name="thumbs",
+)
+
+
+@app.middleware("http")
+async def cache_immutable_thumbs(request, call_next):
+    """Mark content-addressed thumbnail responses as immutable."""
+    response = await call_next(request)
+    if request.url.path.startswith("/static/thumbs/") and response.status_code == 200:
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+    return response
+
+
 @app.middleware("http")
 async def force_https_redirects(request, call_next):
     """Force HTTPS in redirect locations.
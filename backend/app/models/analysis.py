@@ -4,10 +4,12 @@ from sqlalchemy import (
     Column,
     Integer,
     Float,
+    Index,
     String,
     Text,
     DateTime,
     ForeignKey,
+    text,
 )
 
 from app.database import Base
@@ -16,6 +18,18 @@ from app.database import Base
 class MessageAnalysis(Base):
     __tablename__ = "message_analysis"
 
+    __table_args__ = (
+        # Partial index matching the "messages with CTA" overview filter,
+        # so the count is answered from the index alone
+        Index(
+            "ix_analysis_has_cta",
+            "cta_type",
+            postgresql_where=text(
+                "cta_type IS NOT NULL AND cta_type NOT IN ('', 'none')"
+            ),
+        ),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     message_id = Column(
         Integer,
@@ -9,6 +9,7 @@ from sqlalchemy import (
     Boolean,
     DateTime,
 )
+from sqlalchemy.orm import relationship
 
 from app.database import Base
 
@@ -38,5 +39,13 @@ class Channel(Base):
         nullable=False,
     )
 
+    # Stats snapshots, newest first; eager-load with selectinload to avoid
+    # per-channel queries
+    stats_snapshots = relationship(
+        "ChannelStats",
+        order_by="desc(ChannelStats.recorded_at)",
+        passive_deletes=True,
+    )
+
     def __repr__(self) -> str:
         return f"<Channel(id={self.id}, title='{self.title}', status='{self.status}')>"
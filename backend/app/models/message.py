@@ -1,5 +1,3 @@
-from datetime import datetime
-
 from sqlalchemy import (
     Column,
     Integer,
@@ -9,7 +7,9 @@ from sqlalchemy import (
     Boolean,
     DateTime,
     ForeignKey,
+    Index,
     UniqueConstraint,
+    text,
 )
 
 from app.database import Base
@@ -24,6 +24,34 @@ class Message(Base):
             "telegram_message_id",
             name="uq_channel_telegram_message",
         ),
+        # Covering index for the heatmap/trends time aggregations: the
+        # GROUP BY extract(... posted_at) + AVG(views_count) queries can run
+        # as index-only scans
+        Index(
+            "messages_posted_views_idx",
+            "posted_at",
+            postgresql_include=["views_count"],
+            postgresql_where=text("posted_at IS NOT NULL"),
+        ),
+        # Composite indexes for the scheduler's hot predicates: the
+        # MAX(telegram_message_id) lookup and the grouped per-channel
+        # content_type / posted_at aggregations become index probes
+        Index(
+            "ix_msg_chan_tgid",
+            "channel_id",
+            text("telegram_message_id DESC"),
+        ),
+        Index("ix_msg_chan_ctype", "channel_id", "content_type"),
+        Index("ix_msg_chan_posted", "channel_id", "posted_at"),
+        # Partial index for "messages with outbound links" filters; most
+        # rows have no links, so the index stays small
+        Index(
+            "messages_with_links_idx",
+            "channel_id",
+            postgresql_where=text(
+                "external_links IS NOT NULL AND external_links <> ''"
+            ),
+        ),
     )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
@@ -51,7 +79,15 @@ class Message(Base):
     cta_text = Column(Text, nullable=True)
     cta_link = Column(Text, nullable=True)
     posted_at = Column(DateTime, nullable=True)
-    scraped_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    # Filled server-side so bulk inserts need not ship N identical values.
+    # now() is timestamptz and would be rendered in the server's local
+    # zone on assignment to this naive column; timezone('utc', ...) keeps
+    # server-defaulted rows aligned with the app's datetime.utcnow()
+    scraped_at = Column(
+        DateTime,
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+    )
 
     def __repr__(self) -> str:
         return (
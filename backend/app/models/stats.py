@@ -1,5 +1,3 @@
-from datetime import datetime
-
 from sqlalchemy import (
     Column,
     Integer,
@@ -7,6 +5,8 @@ from sqlalchemy import (
     Float,
     DateTime,
     ForeignKey,
+    Index,
+    text,
 )
 
 from app.database import Base
@@ -15,6 +15,16 @@ from app.database import Base
 class ChannelStats(Base):
     __tablename__ = "channel_stats"
 
+    __table_args__ = (
+        # Matches the "history for one channel, newest first, LIMIT n"
+        # access pattern: index-ordered scan, no sort step
+        Index(
+            "channel_stats_cid_rec_desc",
+            "channel_id",
+            text("recorded_at DESC"),
+        ),
+    )
+
     id = Column(Integer, primary_key=True, autoincrement=True)
     channel_id = Column(
         Integer,
@@ -29,7 +39,14 @@ class ChannelStats(Base):
     videos_count = Column(Integer, default=0, nullable=False)
     files_count = Column(Integer, default=0, nullable=False)
     links_count = Column(Integer, default=0, nullable=False)
-    recorded_at = Column(DateTime, default=datetime.utcnow, nullable=False, index=True)
+    # timezone('utc', now()): plain now() would land in the server's
+    # local zone and skew against the app's datetime.utcnow() rows
+    recorded_at = Column(
+        DateTime,
+        server_default=text("timezone('utc', now())"),
+        nullable=False,
+        index=True,
+    )
 
     def __repr__(self) -> str:
         return (
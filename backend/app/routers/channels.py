@@ -10,7 +10,8 @@ from sqlalchemy.orm import Session
 from app.database import get_db, SessionLocal
 from app.models.channel import Channel
 from app.models.discovery import ChannelDiscovery
-from app.services.telegram_client import telegram_scraper
+from app.services.scheduler import invalidate_approved_cache
+from app.services.telegram_client import get_api_scraper, run_telegram
 
 logger = logging.getLogger(__name__)
 
@@ -182,16 +183,10 @@ def add_channel(
             detail=f"Channel @{username} already exists with ID {existing.id}",
         )
 
-    # Try to fetch info from Telegram
+    # Try to fetch info from Telegram (on the API scraper's owning loop;
+    # driving the shared scraper from a throwaway loop corrupts it)
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            info = loop.run_until_complete(
-                telegram_scraper.get_channel_info(username)
-            )
-        finally:
-            loop.close()
+        info = run_telegram(get_api_scraper().get_channel_info(username))
     except Exception as e:
         logger.error(f"Failed to fetch Telegram info for @{username}: {e}")
         info = None
@@ -256,6 +251,7 @@ def approve_channel(
     channel.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(channel)
+    invalidate_approved_cache()
     logger.info(f"Channel {channel.title} (ID: {channel_id}) approved.")
     return channel
 
@@ -279,6 +275,7 @@ def reject_channel(
     channel.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(channel)
+    invalidate_approved_cache()
     logger.info(f"Channel {channel.title} (ID: {channel_id}) rejected.")
     return channel
 
@@ -294,14 +291,9 @@ def sync_telegram_channels(
     descriptions) in a background task to avoid timeouts.
     """
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            joined_channels = loop.run_until_complete(
-                telegram_scraper.get_joined_channels()
-            )
-        finally:
-            loop.close()
+        joined_channels = run_telegram(
+            get_api_scraper().get_joined_channels(), timeout=120.0
+        )
     except Exception as e:
         logger.error(f"Failed to sync Telegram channels: {e}")
         raise HTTPException(
@@ -409,26 +401,26 @@ async def _enrich_channels_async(scraper, channels: list, db) -> None:
     except Exception as e:
         logger.warning(f"Failed to pre-load dialogs for entity cache: {e}")
 
+    # One batched resolution + bounded-concurrency full fetches instead
+    # of a sequential per-channel loop with a fixed sleep
+    results = await scraper.enrich_channels_bulk(
+        [ch.telegram_id for ch in channels]
+    )
+
     enriched = 0
     for ch in channels:
-        try:
-            data = await scraper.enrich_channel(ch.telegram_id)
-            if data:
-                ch.description = data.get("description") or ch.description
-                ch.photo_url = data.get("photo_url") or ch.photo_url
-                ch.subscribers_count = data.get("subscribers_count", 0)
-                ch.is_verified = data.get("is_verified", ch.is_verified)
-                ch.username = data.get("username") or ch.username
-                db.commit()
-                enriched += 1
-                logger.info(
-                    f"Enriched {ch.title}: {ch.subscribers_count} subscribers"
-                )
-        except Exception as e:
-            logger.warning(f"Failed to enrich {ch.title}: {e}")
-
-        # Rate limit: 1 second between each API call
-        await asyncio.sleep(1)
+        data = results.get(ch.telegram_id)
+        if data:
+            ch.description = data.get("description") or ch.description
+            ch.photo_url = data.get("photo_url") or ch.photo_url
+            ch.subscribers_count = data.get("subscribers_count", 0)
+            ch.is_verified = data.get("is_verified", ch.is_verified)
+            ch.username = data.get("username") or ch.username
+            enriched += 1
+            logger.info(
+                f"Enriched {ch.title}: {ch.subscribers_count} subscribers"
+            )
+    db.commit()
 
     logger.info(f"Background enrichment complete: {enriched}/{len(channels)} channels enriched.")
 
@@ -446,5 +438,6 @@ def delete_channel(
     title = channel.title
     db.delete(channel)
     db.commit()
+    invalidate_approved_cache()
     logger.info(f"Channel {title} (ID: {channel_id}) deleted.")
     return {"message": f"Channel '{title}' deleted successfully"}
@@ -16,7 +16,11 @@ from app.database import get_db, SessionLocal
 from app.models.channel import Channel
 from app.models.message import Message
 from app.models.analysis import MessageAnalysis
-from app.services.telegram_client import TelegramScraper, telegram_scraper
+from app.services.telegram_client import (
+    TelegramScraper,
+    get_api_scraper,
+    run_telegram,
+)
 from app.services.analyzer import message_analyzer
 
 logger = logging.getLogger(__name__)
@@ -268,18 +272,16 @@ def scrape_channel_messages(
     min_id = last_message.telegram_message_id if last_message else 0
 
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            raw_messages = loop.run_until_complete(
-                telegram_scraper.get_channel_messages(
-                    channel_identifier=channel_identifier,
-                    limit=settings.MAX_MESSAGES_PER_SCRAPE,
-                    min_id=min_id,
-                )
-            )
-        finally:
-            loop.close()
+        # API scraper on its owning loop; the shared scraper belongs to
+        # the scheduler's loop and must not be driven from here
+        raw_messages = run_telegram(
+            get_api_scraper().get_channel_messages(
+                channel_identifier=channel_identifier,
+                limit=settings.MAX_MESSAGES_PER_SCRAPE,
+                min_id=min_id,
+            ),
+            timeout=300.0,
+        )
     except Exception as e:
         logger.error(f"Telegram scrape failed for channel {channel_id}: {e}")
         raise HTTPException(
@@ -295,41 +297,41 @@ def scrape_channel_messages(
             db.query(Message)
             .filter(
                 Message.channel_id == channel_id,
-                Message.telegram_message_id == msg_data["telegram_message_id"],
+                Message.telegram_message_id == msg_data.telegram_message_id,
             )
             .first()
         )
 
         if existing:
-            existing.views_count = msg_data.get("views_count", existing.views_count)
-            existing.forwards_count = msg_data.get("forwards_count", existing.forwards_count)
-            existing.replies_count = msg_data.get("replies_count", existing.replies_count)
-            existing.reactions_count = msg_data.get("reactions_count", existing.reactions_count)
-            existing.reactions_json = msg_data.get("reactions_json") or existing.reactions_json
-            existing.is_pinned = msg_data.get("is_pinned", existing.is_pinned)
-            existing.forward_from = msg_data.get("forward_from") or existing.forward_from
-            existing.media_url = msg_data.get("media_url") or existing.media_url
+            existing.views_count = msg_data.views_count
+            existing.forwards_count = msg_data.forwards_count
+            existing.replies_count = msg_data.replies_count
+            existing.reactions_count = msg_data.reactions_count
+            existing.reactions_json = msg_data.reactions_json or existing.reactions_json
+            existing.is_pinned = msg_data.is_pinned
+            existing.forward_from = msg_data.forward_from or existing.forward_from
+            existing.media_url = msg_data.media_url or existing.media_url
             updated_count += 1
         else:
             message = Message(
                 channel_id=channel_id,
-                telegram_message_id=msg_data["telegram_message_id"],
-                content_type=msg_data.get("content_type", "text"),
-                text_content=msg_data.get("text_content"),
-                media_url=msg_data.get("media_url"),
-                voice_duration=msg_data.get("voice_duration"),
-                views_count=msg_data.get("views_count", 0),
-                forwards_count=msg_data.get("forwards_count", 0),
-                replies_count=msg_data.get("replies_count", 0),
-                reactions_count=msg_data.get("reactions_count", 0),
-                reactions_json=msg_data.get("reactions_json"),
-                is_pinned=msg_data.get("is_pinned", False),
-                forward_from=msg_data.get("forward_from"),
-                external_links=msg_data.get("external_links"),
-                has_cta=msg_data.get("has_cta", False),
-                cta_text=msg_data.get("cta_text"),
-                cta_link=msg_data.get("cta_link"),
-                posted_at=msg_data.get("posted_at"),
+                telegram_message_id=msg_data.telegram_message_id,
+                content_type=msg_data.content_type,
+                text_content=msg_data.text_content,
+                media_url=msg_data.media_url,
+                voice_duration=msg_data.voice_duration,
+                views_count=msg_data.views_count,
+                forwards_count=msg_data.forwards_count,
+                replies_count=msg_data.replies_count,
+                reactions_count=msg_data.reactions_count,
+                reactions_json=msg_data.reactions_json,
+                is_pinned=msg_data.is_pinned,
+                forward_from=msg_data.forward_from,
+                external_links=msg_data.external_links_json,
+                has_cta=msg_data.has_cta,
+                cta_text=msg_data.cta_text,
+                cta_link=msg_data.cta_link,
+                posted_at=msg_data.posted_at,
                 scraped_at=datetime.utcnow(),
             )
             db.add(message)
@@ -534,41 +536,41 @@ async def _scrape_channels_async(
                             db.query(Message)
                             .filter(
                                 Message.channel_id == ch_id,
-                                Message.telegram_message_id == msg_data["telegram_message_id"],
+                                Message.telegram_message_id == msg_data.telegram_message_id,
                             )
                             .first()
                         )
 
                         if existing:
-                            existing.views_count = msg_data.get("views_count", existing.views_count)
-                            existing.forwards_count = msg_data.get("forwards_count", existing.forwards_count)
-                            existing.replies_count = msg_data.get("replies_count", existing.replies_count)
-                            existing.reactions_count = msg_data.get("reactions_count", existing.reactions_count)
-                            existing.reactions_json = msg_data.get("reactions_json") or existing.reactions_json
-                            existing.is_pinned = msg_data.get("is_pinned", existing.is_pinned)
-                            existing.forward_from = msg_data.get("forward_from") or existing.forward_from
-                            existing.media_url = msg_data.get("media_url") or existing.media_url
+                            existing.views_count = msg_data.views_count
+                            existing.forwards_count = msg_data.forwards_count
+                            existing.replies_count = msg_data.replies_count
+                            existing.reactions_count = msg_data.reactions_count
+                            existing.reactions_json = msg_data.reactions_json or existing.reactions_json
+                            existing.is_pinned = msg_data.is_pinned
+                            existing.forward_from = msg_data.forward_from or existing.forward_from
+                            existing.media_url = msg_data.media_url or existing.media_url
                             ch_updated += 1
                         else:
                             message = Message(
                                 channel_id=ch_id,
-                                telegram_message_id=msg_data["telegram_message_id"],
-                                content_type=msg_data.get("content_type", "text"),
-                                text_content=msg_data.get("text_content"),
-                                media_url=msg_data.get("media_url"),
-                                voice_duration=msg_data.get("voice_duration"),
-                                views_count=msg_data.get("views_count", 0),
-                                forwards_count=msg_data.get("forwards_count", 0),
-                                replies_count=msg_data.get("replies_count", 0),
-                                reactions_count=msg_data.get("reactions_count", 0),
-                                reactions_json=msg_data.get("reactions_json"),
-                                is_pinned=msg_data.get("is_pinned", False),
-                                forward_from=msg_data.get("forward_from"),
-                                external_links=msg_data.get("external_links"),
-                                has_cta=msg_data.get("has_cta", False),
-                                cta_text=msg_data.get("cta_text"),
-                                cta_link=msg_data.get("cta_link"),
-                                posted_at=msg_data.get("posted_at"),
+                                telegram_message_id=msg_data.telegram_message_id,
+                                content_type=msg_data.content_type,
+                                text_content=msg_data.text_content,
+                                media_url=msg_data.media_url,
+                                voice_duration=msg_data.voice_duration,
+                                views_count=msg_data.views_count,
+                                forwards_count=msg_data.forwards_count,
+                                replies_count=msg_data.replies_count,
+                                reactions_count=msg_data.reactions_count,
+                                reactions_json=msg_data.reactions_json,
+                                is_pinned=msg_data.is_pinned,
+                                forward_from=msg_data.forward_from,
+                                external_links=msg_data.external_links_json,
+                                has_cta=msg_data.has_cta,
+                                cta_text=msg_data.cta_text,
+                                cta_link=msg_data.cta_link,
+                                posted_at=msg_data.posted_at,
                                 scraped_at=datetime.utcnow(),
                             )
                             db.add(message)
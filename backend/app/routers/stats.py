@@ -1,25 +1,109 @@
 import asyncio
 import logging
 import shutil
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from datetime import datetime, timedelta
+from itertools import groupby
+from operator import attrgetter
 from typing import Any, Dict, List, Optional
 
 from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
-from pydantic import BaseModel
-from sqlalchemy import func, extract
-from sqlalchemy.orm import Session
+from fastapi.responses import ORJSONResponse
+from fastapi_cache import FastAPICache
+from fastapi_cache.decorator import cache
+from pydantic import BaseModel, TypeAdapter
+from sqlalchemy import Float, Numeric, cast, desc, func, extract, insert, select
+from sqlalchemy.orm import Session, raiseload
 
 from app.config import settings
-from app.database import get_db, SessionLocal
+from app.database import get_db, AsyncSessionLocal, SessionLocal
 from app.models.channel import Channel
 from app.models.message import Message
 from app.models.stats import ChannelStats
 from app.models.analysis import MessageAnalysis
-from app.services.telegram_client import telegram_scraper
+from app.services.telegram_client import get_api_scraper, run_telegram
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/api/stats", tags=["stats"])
+router = APIRouter(
+    prefix="/api/stats",
+    tags=["stats"],
+    default_response_class=ORJSONResponse,
+)
+
+# Shared background event loop for async work from sync endpoints (cache
+# invalidation, task-queue enqueues, and the snapshot-all task's private
+# session-copy scraper). Shared-scraper calls go through run_telegram()
+# instead, which owns its own loop.
+_bg_loop = asyncio.new_event_loop()
+threading.Thread(
+    target=_bg_loop.run_forever, name="stats-telegram-loop", daemon=True
+).start()
+
+
+def _run_async(coro, timeout: float = 30.0):
+    """Run a coroutine on the shared background loop and wait for the result.
+
+    On timeout the coroutine is cancelled, not abandoned: a stuck call
+    must not keep running (and holding the loop) after its caller gave up.
+    """
+    future = asyncio.run_coroutine_threadsafe(coro, _bg_loop)
+    try:
+        return future.result(timeout)
+    except FutureTimeoutError:
+        future.cancel()
+        raise
+
+
+def _cache_key_builder(
+    func, namespace, *, request=None, response=None, args=(), kwargs=None
+) -> str:
+    """Cache key from endpoint name + query string.
+
+    The default key builder hashes all kwargs, including the per-request
+    db Session, which would defeat the cache.
+    """
+    query = request.url.query if request is not None else ""
+    return f"{namespace}:{func.__name__}:{query}"
+
+
+def _invalidate_stats_cache() -> None:
+    """Drop all cached stats responses after snapshot writes."""
+    try:
+        _run_async(FastAPICache.clear())
+    except Exception as e:
+        logger.debug(f"Stats cache clear skipped: {e}")
+
+
+# Lazily created arq connection pool (only when REDIS_URL is configured)
+_arq_pool = None
+
+
+async def _enqueue_snapshot_all(channel_data: list) -> None:
+    """Enqueue the snapshot-all job on the arq task queue."""
+    global _arq_pool
+    if _arq_pool is None:
+        from arq import create_pool
+        from arq.connections import RedisSettings
+
+        _arq_pool = await create_pool(RedisSettings.from_dsn(settings.REDIS_URL))
+    await _arq_pool.enqueue_job("snapshot_all_job", channel_data)
+
+
+# Fixed number of sparkline points sent per channel in /growth
+SPARKLINE_POINTS = 12
+
+# Indexed by PostgreSQL dow (0 = Sunday)
+DAY_NAMES = (
+    "Sunday",
+    "Monday",
+    "Tuesday",
+    "Wednesday",
+    "Thursday",
+    "Friday",
+    "Saturday",
+)
 
 
 # ---- Pydantic Schemas ----
@@ -62,6 +146,11 @@ class TopChannelResponse(BaseModel):
     avg_engagement: float
 
 
+# Module-level adapter: validates/serializes SQL rows directly, skipping the
+# intermediate per-row dict construction
+_top_channels_adapter = TypeAdapter(List[TopChannelResponse])
+
+
 class SnapshotResultResponse(BaseModel):
     channel_id: int
     channel_title: str
@@ -69,49 +158,69 @@ class SnapshotResultResponse(BaseModel):
     snapshot_recorded: bool
 
 
+class BulkSnapshotRequest(BaseModel):
+    channel_ids: List[int]
+
+
+class BulkSnapshotResponse(BaseModel):
+    snapshots_recorded: int
+    channels_missing: List[int]
+
+
 # ---- Endpoints ----
 
 
 @router.get("/overview", response_model=OverviewResponse)
+@cache(expire=300, key_builder=_cache_key_builder)
 def get_overview(
     db: Session = Depends(get_db),
 ) -> dict:
-    """Get global statistics overview."""
-    total_channels = db.query(func.count(Channel.id)).scalar() or 0
-    approved_channels = (
-        db.query(func.count(Channel.id))
-        .filter(Channel.status == "approved")
-        .scalar()
-        or 0
-    )
-    pending_channels = (
-        db.query(func.count(Channel.id))
-        .filter(Channel.status == "pending")
-        .scalar()
-        or 0
-    )
-    total_messages = db.query(func.count(Message.id)).scalar() or 0
-    analyzed_messages = db.query(func.count(MessageAnalysis.id)).scalar() or 0
-    total_stats_snapshots = db.query(func.count(ChannelStats.id)).scalar() or 0
-    messages_with_cta = (
-        db.query(func.count(MessageAnalysis.id))
-        .filter(
-            MessageAnalysis.cta_type.isnot(None),
-            MessageAnalysis.cta_type != "none",
-            MessageAnalysis.cta_type != "",
+    """Get global statistics overview.
+
+    All seven counts are fetched as scalar subqueries of one SELECT, so
+    the dashboard load costs a single round-trip instead of seven.
+    """
+    row = db.execute(
+        select(
+            select(func.count(Channel.id))
+            .scalar_subquery()
+            .label("total_channels"),
+            select(func.count(Channel.id))
+            .where(Channel.status == "approved")
+            .scalar_subquery()
+            .label("approved_channels"),
+            select(func.count(Channel.id))
+            .where(Channel.status == "pending")
+            .scalar_subquery()
+            .label("pending_channels"),
+            select(func.count(Message.id))
+            .scalar_subquery()
+            .label("total_messages"),
+            select(func.count(MessageAnalysis.id))
+            .scalar_subquery()
+            .label("analyzed_messages"),
+            select(func.count(ChannelStats.id))
+            .scalar_subquery()
+            .label("total_stats_snapshots"),
+            select(func.count(MessageAnalysis.id))
+            .where(
+                MessageAnalysis.cta_type.isnot(None),
+                MessageAnalysis.cta_type != "none",
+                MessageAnalysis.cta_type != "",
+            )
+            .scalar_subquery()
+            .label("messages_with_cta"),
         )
-        .scalar()
-        or 0
-    )
+    ).one()
 
     return {
-        "total_channels": total_channels,
-        "approved_channels": approved_channels,
-        "pending_channels": pending_channels,
-        "total_messages": total_messages,
-        "analyzed_messages": analyzed_messages,
-        "total_stats_snapshots": total_stats_snapshots,
-        "messages_with_cta": messages_with_cta,
+        "total_channels": row.total_channels or 0,
+        "approved_channels": row.approved_channels or 0,
+        "pending_channels": row.pending_channels or 0,
+        "total_messages": row.total_messages or 0,
+        "analyzed_messages": row.analyzed_messages or 0,
+        "total_stats_snapshots": row.total_stats_snapshots or 0,
+        "messages_with_cta": row.messages_with_cta or 0,
     }
 
 
@@ -122,12 +231,12 @@ def get_channel_stats(
     db: Session = Depends(get_db),
 ) -> List[ChannelStats]:
     """Get stats history for a specific channel."""
-    channel = db.query(Channel).filter(Channel.id == channel_id).first()
-    if not channel:
+    if not db.query(Channel.id).filter(Channel.id == channel_id).scalar():
         raise HTTPException(status_code=404, detail="Channel not found")
 
     stats = (
         db.query(ChannelStats)
+        .options(raiseload("*"))
         .filter(ChannelStats.channel_id == channel_id)
         .order_by(ChannelStats.recorded_at.desc())
         .limit(limit)
@@ -137,6 +246,7 @@ def get_channel_stats(
 
 
 @router.get("/top-channels", response_model=List[TopChannelResponse])
+@cache(expire=300, key_builder=_cache_key_builder)
 def get_top_channels(
     sort_by: str = Query(
         "total_views",
@@ -146,9 +256,42 @@ def get_top_channels(
     db: Session = Depends(get_db),
 ) -> List[dict]:
     """Get top channels ranked by engagement metrics."""
-    # Query channels with aggregated message stats
-    results = (
-        db.query(
+    # Static whitelist of sortable result aliases; ORDER BY references the
+    # labelled aggregate already computed in the SELECT list, so no
+    # duplicate aggregate expression is built per call
+    allowed_sorts = (
+        "total_views",
+        "total_forwards",
+        "total_reactions",
+        "total_messages",
+    )
+
+    if sort_by not in allowed_sorts:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid sort_by. Must be one of: {', '.join(allowed_sorts)}",
+        )
+
+    # Latest snapshot per channel via one window-function pass over
+    # channel_stats, joined once (no correlated re-execution per row)
+    latest_stats = (
+        select(
+            ChannelStats.channel_id,
+            ChannelStats.subscribers_count,
+            func.row_number()
+            .over(
+                partition_by=ChannelStats.channel_id,
+                order_by=ChannelStats.recorded_at.desc(),
+            )
+            .label("rn"),
+        )
+        .subquery()
+    )
+
+    # Query channels with aggregated message stats (Core select: rows, not
+    # ORM entities — aggregates don't need the identity map)
+    stmt = (
+        select(
             Channel.id.label("channel_id"),
             Channel.title,
             Channel.username,
@@ -161,92 +304,178 @@ def get_top_channels(
             func.coalesce(func.sum(Message.reactions_count), 0).label(
                 "total_reactions"
             ),
+            func.coalesce(
+                func.max(latest_stats.c.subscribers_count), 0
+            ).label("latest_subscribers"),
+            func.coalesce(
+                func.round(
+                    cast(
+                        func.sum(Message.views_count)
+                        / func.nullif(cast(func.count(Message.id), Float), 0),
+                        Numeric,
+                    ),
+                    2,
+                ),
+                0.0,
+            ).label("avg_engagement"),
         )
         .outerjoin(Message, Message.channel_id == Channel.id)
-        .filter(Channel.status == "approved")
+        .outerjoin(
+            latest_stats,
+            (latest_stats.c.channel_id == Channel.id)
+            & (latest_stats.c.rn == 1),
+        )
+        .where(Channel.status == "approved")
         .group_by(Channel.id, Channel.title, Channel.username, Channel.status)
+        .order_by(desc(sort_by))
     )
 
-    # Apply sorting
-    sort_column_map = {
-        "total_views": "total_views",
-        "total_forwards": "total_forwards",
-        "total_reactions": "total_reactions",
-        "total_messages": "total_messages",
-    }
+    rows = db.execute(stmt.limit(limit)).all()
 
-    if sort_by not in sort_column_map:
-        raise HTTPException(
-            status_code=400,
-            detail=f"Invalid sort_by. Must be one of: {', '.join(sort_column_map.keys())}",
-        )
+    # Rows already carry the full response shape; validate straight from
+    # row attributes without building intermediate dicts
+    return _top_channels_adapter.validate_python(rows, from_attributes=True)
 
-    results = results.order_by(func.coalesce(func.sum(
-        getattr(Message, sort_by.replace("total_", "") + "_count")
-        if sort_by != "total_messages"
-        else Message.id
-    ), 0).desc())
 
-    rows = results.limit(limit).all()
+# Registered ahead of /snapshot/{channel_id}: FastAPI matches routes in
+# declaration order, so the parameterized route would otherwise swallow
+# /snapshot/bulk and 422 on channel_id="bulk"
+@router.post("/snapshot/bulk", response_model=BulkSnapshotResponse)
+def trigger_stats_snapshot_bulk(
+    payload: BulkSnapshotRequest,
+    db: Session = Depends(get_db),
+) -> dict:
+    """Record stats snapshots for a list of channels in one transaction.
 
-    top_channels: List[dict] = []
-    for row in rows:
-        # Get latest subscriber count from stats
-        latest_stats = (
-            db.query(ChannelStats)
-            .filter(ChannelStats.channel_id == row.channel_id)
-            .order_by(ChannelStats.recorded_at.desc())
-            .first()
+    Computes all media/link counts with a single pivoted GROUP BY and
+    writes all snapshot rows with one batched INSERT, so a sweep of N
+    channels commits once instead of N times.
+    """
+    channels = db.execute(
+        select(Channel.id, Channel.title, Channel.username, Channel.telegram_id)
+        .where(Channel.id.in_(payload.channel_ids))
+    ).all()
+    channels_missing = sorted(
+        set(payload.channel_ids) - {ch.id for ch in channels}
+    )
+
+    if not channels:
+        return {"snapshots_recorded": 0, "channels_missing": channels_missing}
+
+    channel_ids = [ch.id for ch in channels]
+
+    # One pivoted aggregate over all requested channels (COUNT ... FILTER)
+    counts_by_channel = {
+        row.channel_id: row
+        for row in db.execute(
+            select(
+                Message.channel_id,
+                func.count(Message.id)
+                .filter(Message.content_type == "photo")
+                .label("photos_count"),
+                func.count(Message.id)
+                .filter(Message.content_type == "video")
+                .label("videos_count"),
+                func.count(Message.id)
+                .filter(Message.content_type == "document")
+                .label("files_count"),
+                func.count(Message.id)
+                .filter(
+                    Message.external_links.isnot(None),
+                    Message.external_links != "",
+                )
+                .label("links_count"),
+            )
+            .where(Message.channel_id.in_(channel_ids))
+            .group_by(Message.channel_id)
         )
-        subscribers = latest_stats.subscribers_count if latest_stats else 0
+    }
 
-        total_msgs = row.total_messages or 0
-        total_views = row.total_views or 0
-        avg_engagement = (
-            round(total_views / total_msgs, 2) if total_msgs > 0 else 0.0
+    # Fetch live subscriber counts concurrently on the API scraper's loop
+    async def _fetch_all_info(scraper) -> list:
+        async def _fetch_one(identifier: str):
+            try:
+                return await scraper.get_channel_info(identifier)
+            except Exception as e:
+                logger.warning(f"Could not fetch live stats for {identifier}: {e}")
+                return None
+
+        return await asyncio.gather(
+            *(
+                _fetch_one(ch.username or str(ch.telegram_id))
+                for ch in channels
+            )
+        )
+
+    infos: list = [None] * len(channels)
+    try:
+        infos = run_telegram(
+            _fetch_all_info(get_api_scraper()),
+            timeout=60.0 + 15.0 * len(channels),
         )
+    except Exception as e:
+        logger.warning(f"Bulk snapshot: live Telegram fetch failed: {e}")
 
-        top_channels.append(
+    now = datetime.utcnow()
+    rows = []
+    for ch, info in zip(channels, infos):
+        counts = counts_by_channel.get(ch.id)
+        rows.append(
             {
-                "channel_id": row.channel_id,
-                "title": row.title,
-                "username": row.username,
-                "status": row.status,
-                "total_messages": total_msgs,
-                "total_views": total_views,
-                "total_forwards": row.total_forwards or 0,
-                "total_reactions": row.total_reactions or 0,
-                "latest_subscribers": subscribers,
-                "avg_engagement": avg_engagement,
+                "channel_id": ch.id,
+                "subscribers_count": info.get("subscribers_count", 0) if info else 0,
+                "photos_count": counts.photos_count if counts else 0,
+                "videos_count": counts.videos_count if counts else 0,
+                "files_count": counts.files_count if counts else 0,
+                "links_count": counts.links_count if counts else 0,
+                "recorded_at": now,
             }
         )
 
-    return top_channels
+    db.execute(insert(ChannelStats).values(rows))
+    db.commit()
+    _invalidate_stats_cache()
+
+    logger.info(f"Bulk snapshot recorded for {len(rows)} channels")
+
+    return {
+        "snapshots_recorded": len(rows),
+        "channels_missing": channels_missing,
+    }
 
 
 @router.post("/snapshot/{channel_id}", response_model=SnapshotResultResponse)
 def trigger_stats_snapshot(
     channel_id: int,
+    allow_partial_snapshot: bool = Query(
+        False,
+        description="Record the snapshot even if the live Telegram fetch fails",
+    ),
     db: Session = Depends(get_db),
 ) -> dict:
-    """Trigger a manual stats snapshot for a channel."""
-    channel = db.query(Channel).filter(Channel.id == channel_id).first()
-    if not channel:
+    """Trigger a manual stats snapshot for a channel.
+
+    If the live Telegram fetch fails, the endpoint returns 503 without
+    running the count queries or inserting a zero-subscriber snapshot,
+    unless allow_partial_snapshot is set.
+    """
+    channel_row = (
+        db.query(Channel.id, Channel.title, Channel.username, Channel.telegram_id)
+        .filter(Channel.id == channel_id)
+        .first()
+    )
+    if not channel_row:
         raise HTTPException(status_code=404, detail="Channel not found")
 
-    channel_identifier = channel.username or str(channel.telegram_id)
+    channel_identifier = channel_row.username or str(channel_row.telegram_id)
 
     # Try to fetch live stats from Telegram
     subscribers_count = 0
+    info = None
     try:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        try:
-            info = loop.run_until_complete(
-                telegram_scraper.get_channel_info(channel_identifier)
-            )
-        finally:
-            loop.close()
+        info = run_telegram(
+            get_api_scraper().get_channel_info(channel_identifier)
+        )
 
         if info:
             subscribers_count = info.get("subscribers_count", 0)
@@ -255,75 +484,62 @@ def trigger_stats_snapshot(
             f"Could not fetch live stats for channel {channel_id}: {e}"
         )
 
-    # Count media types from messages
-    photos_count = (
-        db.query(func.count(Message.id))
-        .filter(
-            Message.channel_id == channel_id,
-            Message.content_type == "photo",
-        )
-        .scalar()
-        or 0
-    )
-    videos_count = (
-        db.query(func.count(Message.id))
-        .filter(
-            Message.channel_id == channel_id,
-            Message.content_type == "video",
-        )
-        .scalar()
-        or 0
-    )
-    files_count = (
-        db.query(func.count(Message.id))
-        .filter(
-            Message.channel_id == channel_id,
-            Message.content_type == "document",
+    if info is None and not allow_partial_snapshot:
+        raise HTTPException(
+            status_code=503,
+            detail="Telegram unavailable; snapshot not recorded",
         )
-        .scalar()
-        or 0
-    )
-
-    # Count messages with external links
-    from sqlalchemy import and_
 
-    links_count = (
-        db.query(func.count(Message.id))
-        .filter(
-            Message.channel_id == channel_id,
-            Message.external_links.isnot(None),
-            Message.external_links != "",
-        )
-        .scalar()
-        or 0
-    )
+    # Media-type and link counts in one conditional-aggregation pass over
+    # the channel's messages instead of four separate COUNT queries
+    counts = db.execute(
+        select(
+            func.count(Message.id)
+            .filter(Message.content_type == "photo")
+            .label("photos_count"),
+            func.count(Message.id)
+            .filter(Message.content_type == "video")
+            .label("videos_count"),
+            func.count(Message.id)
+            .filter(Message.content_type == "document")
+            .label("files_count"),
+            func.count(Message.id)
+            .filter(
+                Message.external_links.isnot(None),
+                Message.external_links != "",
+            )
+            .label("links_count"),
+        ).where(Message.channel_id == channel_id)
+    ).one()
 
     stats = ChannelStats(
         channel_id=channel_id,
         subscribers_count=subscribers_count,
-        photos_count=photos_count,
-        videos_count=videos_count,
-        files_count=files_count,
-        links_count=links_count,
+        photos_count=counts.photos_count,
+        videos_count=counts.videos_count,
+        files_count=counts.files_count,
+        links_count=counts.links_count,
         recorded_at=datetime.utcnow(),
     )
     db.add(stats)
     db.commit()
+    _invalidate_stats_cache()
 
     logger.info(
-        f"Stats snapshot recorded for channel {channel.title} "
+        f"Stats snapshot recorded for channel {channel_row.title} "
         f"(subscribers: {subscribers_count})"
     )
 
     return {
         "channel_id": channel_id,
-        "channel_title": channel.title,
+        "channel_title": channel_row.title,
         "subscribers_count": subscribers_count,
         "snapshot_recorded": True,
     }
 
 
 @router.get("/heatmap")
+@cache(expire=3600, key_builder=_cache_key_builder)
 def get_posting_heatmap(
     db: Session = Depends(get_db),
 ) -> dict:
@@ -331,124 +547,150 @@ def get_posting_heatmap(
 
     Returns engagement averages for all tracked channels.
     """
-    rows = (
-        db.query(
+    rows = db.execute(
+        select(
             extract("dow", Message.posted_at).label("dow"),
             extract("hour", Message.posted_at).label("hour"),
             func.avg(Message.views_count).label("avg_views"),
             func.count(Message.id).label("count"),
         )
-        .filter(Message.posted_at.isnot(None))
+        .where(Message.posted_at.isnot(None))
         .group_by(
             extract("dow", Message.posted_at),
             extract("hour", Message.posted_at),
         )
-        .all()
-    )
+    ).all()
 
-    heatmap = []
-    for r in rows:
-        heatmap.append({
+    heatmap = [
+        {
             "day": int(r.dow) if r.dow is not None else 0,
             "hour": int(r.hour) if r.hour is not None else 0,
             "avg_views": round(float(r.avg_views), 0) if r.avg_views else 0,
             "count": r.count,
-        })
+        }
+        for r in rows
+    ]
 
-    # Find best time
-    best = max(heatmap, key=lambda x: x["avg_views"]) if heatmap else None
-    day_names = ["Sunday", "Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday"]
+    # Best time straight from the database: same grouping, ordered by
+    # average views, first row only
+    best = db.execute(
+        select(
+            extract("dow", Message.posted_at).label("dow"),
+            extract("hour", Message.posted_at).label("hour"),
+            func.avg(Message.views_count).label("avg_views"),
+        )
+        .where(Message.posted_at.isnot(None))
+        .group_by(
+            extract("dow", Message.posted_at),
+            extract("hour", Message.posted_at),
+        )
+        .order_by(func.avg(Message.views_count).desc())
+        .limit(1)
+    ).first()
 
+    # Plain dict payload (cacheable); response_class still serializes it
+    # with orjson
     return {
         "heatmap": heatmap,
         "best_time": {
-            "day": day_names[best["day"]] if best else "N/A",
-            "hour": best["hour"] if best else 0,
-            "avg_views": best["avg_views"] if best else 0,
+            "day": DAY_NAMES[int(best.dow) if best.dow is not None else 0],
+            "hour": int(best.hour) if best.hour is not None else 0,
+            "avg_views": round(float(best.avg_views), 0) if best.avg_views else 0,
         } if best else None,
     }
 
 
 @router.get("/trends")
-def get_trends(
-    db: Session = Depends(get_db),
+@cache(expire=3600, key_builder=_cache_key_builder)
+async def get_trends(
+    limit: int = Query(20, ge=1, le=100),
 ) -> dict:
-    """Get trending data: top hooks, posting patterns, alerts."""
-    from collections import Counter
+    """Get trending data: top hooks, posting patterns, alerts.
 
-    # Top hooks across all channels
-    all_analyses = (
-        db.query(
+    channel_summaries is bounded to the top `limit` channels by message
+    count instead of materializing every approved channel. The three
+    independent aggregates run concurrently on async sessions, so the
+    endpoint costs max(q1, q2, q3) instead of their sum.
+    """
+    # Top hooks across all channels: aggregate in SQL so only 10 rows
+    # cross the wire instead of every analysis row
+    hooks_stmt = (
+        select(
             MessageAnalysis.hook_type,
-            MessageAnalysis.engagement_score,
-            Message.channel_id,
-            Message.posted_at,
-            Message.views_count,
+            func.count().label("count"),
+            func.avg(MessageAnalysis.engagement_score).label("avg_engagement"),
         )
-        .join(Message, Message.id == MessageAnalysis.message_id)
-        .filter(MessageAnalysis.hook_type.isnot(None))
-        .all()
+        # No join to messages: every aggregated column lives on
+        # message_analysis and the FK guarantees one message per analysis
+        .where(
+            MessageAnalysis.hook_type.isnot(None),
+            MessageAnalysis.hook_type != "none",
+        )
+        .group_by(MessageAnalysis.hook_type)
+        .order_by(func.count().desc())
+        .limit(10)
     )
 
-    hook_counter = Counter()
-    hook_scores = {}
-    for hook, score, ch_id, posted_at, views in all_analyses:
-        if hook and hook != "none":
-            hook_counter[hook] += 1
-            if hook not in hook_scores:
-                hook_scores[hook] = []
-            if score is not None:
-                hook_scores[hook].append(score)
-
-    top_hooks = [
-        {
-            "type": h,
-            "count": c,
-            "avg_engagement": round(
-                sum(hook_scores.get(h, [0])) / max(len(hook_scores.get(h, [1])), 1), 2
-            ),
-        }
-        for h, c in hook_counter.most_common(10)
-    ]
-
     # Best posting hours globally
-    hour_data = (
-        db.query(
+    hours_stmt = (
+        select(
             extract("hour", Message.posted_at).label("hour"),
             func.avg(Message.views_count).label("avg_views"),
             func.count(Message.id).label("count"),
         )
-        .filter(Message.posted_at.isnot(None))
+        .where(Message.posted_at.isnot(None))
         .group_by(extract("hour", Message.posted_at))
         .order_by(func.avg(Message.views_count).desc())
         .limit(5)
-        .all()
     )
 
-    best_hours = [
-        {
-            "hour": int(h.hour) if h.hour is not None else 0,
-            "avg_views": round(float(h.avg_views), 0) if h.avg_views else 0,
-            "count": h.count,
-        }
-        for h in hour_data
-    ]
-
     # Per-channel message count for alerts
-    channel_activity = (
-        db.query(
+    activity_stmt = (
+        select(
             Channel.id,
             Channel.title,
             func.count(Message.id).label("msg_count"),
             func.avg(Message.views_count).label("avg_views"),
         )
         .join(Message, Message.channel_id == Channel.id)
-        .filter(Channel.status == "approved")
+        .where(Channel.status == "approved")
         .group_by(Channel.id, Channel.title)
         .order_by(func.count(Message.id).desc())
-        .all()
+        .limit(limit)
+    )
+
+    async def _fetch_all(stmt):
+        # One session per statement: an AsyncSession cannot run
+        # concurrent operations
+        async with AsyncSessionLocal() as session:
+            return (await session.execute(stmt)).all()
+
+    hook_rows, hour_data, channel_activity = await asyncio.gather(
+        _fetch_all(hooks_stmt),
+        _fetch_all(hours_stmt),
+        _fetch_all(activity_stmt),
     )
 
+    top_hooks = [
+        {
+            "type": r.hook_type,
+            "count": r.count,
+            "avg_engagement": round(float(r.avg_engagement), 2)
+            if r.avg_engagement is not None
+            else 0.0,
+        }
+        for r in hook_rows
+    ]
+
+    best_hours = [
+        {
+            "hour": int(h.hour) if h.hour is not None else 0,
+            "avg_views": round(float(h.avg_views), 0) if h.avg_views else 0,
+            "count": h.count,
+        }
+        for h in hour_data
+    ]
+
     channel_summaries = [
         {
             "channel_id": ca.id,
@@ -467,6 +709,7 @@ def get_trends(
 
 
 @router.get("/growth")
+@cache(expire=600, key_builder=_cache_key_builder)
 def get_channels_growth(
     db: Session = Depends(get_db),
 ) -> List[dict]:
@@ -474,79 +717,139 @@ def get_channels_growth(
 
     Returns 24h, 7d, 30d growth (absolute + percentage) and sparkline data.
     """
-    channels = (
-        db.query(Channel)
-        .filter(Channel.status == "approved")
-        .all()
+    now = datetime.utcnow()
+
+    def _snap_before(days: float):
+        """Subscribers from the newest snapshot at least `days` old.
+
+        Correlated per-channel subquery: an index-ordered LIMIT 1 lookup
+        on channel_stats_cid_rec_desc, evaluated by the database instead
+        of scanning snapshot history in Python.
+        """
+        return (
+            select(ChannelStats.subscribers_count)
+            .where(
+                ChannelStats.channel_id == Channel.id,
+                ChannelStats.recorded_at <= now - timedelta(days=days),
+            )
+            .order_by(ChannelStats.recorded_at.desc())
+            .limit(1)
+            .correlate(Channel)
+            .scalar_subquery()
+        )
+
+    latest_subs_sq = (
+        select(ChannelStats.subscribers_count)
+        .where(ChannelStats.channel_id == Channel.id)
+        .order_by(ChannelStats.recorded_at.desc())
+        .limit(1)
+        .correlate(Channel)
+        .scalar_subquery()
+    )
+    first_recorded_sq = (
+        select(func.min(ChannelStats.recorded_at))
+        .where(ChannelStats.channel_id == Channel.id)
+        .correlate(Channel)
+        .scalar_subquery()
     )
 
-    now = datetime.utcnow()
+    # One statement: channels plus latest/reference subscriber counts and
+    # first-snapshot time, all resolved SQL-side per channel
+    channels = db.execute(
+        select(
+            Channel.id,
+            Channel.title,
+            Channel.username,
+            Channel.photo_url,
+            Channel.subscribers_count,
+            latest_subs_sq.label("latest_subs"),
+            _snap_before(0.8).label("ref_24h"),
+            _snap_before(6.5).label("ref_7d"),
+            _snap_before(29).label("ref_30d"),
+            first_recorded_sq.label("first_recorded"),
+        ).where(Channel.status == "approved")
+    ).all()
+
+    # Last 30 snapshots for ALL channels in one windowed query (sparkline
+    # series only) instead of one LIMIT 30 query per channel
+    snap_window = (
+        select(
+            ChannelStats.channel_id,
+            ChannelStats.subscribers_count,
+            func.row_number()
+            .over(
+                partition_by=ChannelStats.channel_id,
+                order_by=ChannelStats.recorded_at.desc(),
+            )
+            .label("rn"),
+        )
+        .subquery()
+    )
+    snapshot_rows = db.execute(
+        select(
+            snap_window.c.channel_id,
+            snap_window.c.subscribers_count,
+        )
+        .where(snap_window.c.rn <= 30)
+        .order_by(snap_window.c.channel_id, snap_window.c.rn)
+    ).all()
+
+    snapshots_by_channel: Dict[int, list] = {
+        channel_id: list(rows)
+        for channel_id, rows in groupby(
+            snapshot_rows, key=attrgetter("channel_id")
+        )
+    }
+
     results = []
 
     for channel in channels:
-        # Get last 30 daily snapshots
-        snapshots = (
-            db.query(ChannelStats)
-            .filter(ChannelStats.channel_id == channel.id)
-            .order_by(ChannelStats.recorded_at.desc())
-            .limit(30)
-            .all()
-        )
+        # Newest-first snapshots for this channel (up to 30)
+        snapshots = snapshots_by_channel.get(channel.id, [])
 
         current_subs = channel.subscribers_count or 0
-        sparkline = []
-        growth_24h = 0
-        growth_24h_pct = 0.0
-        growth_7d = 0
-        growth_7d_pct = 0.0
-        growth_30d = 0
-        growth_30d_pct = 0.0
-
-        if snapshots:
-            # Latest snapshot is the most recent
-            current_subs = snapshots[0].subscribers_count or current_subs
-
-            # Build sparkline (oldest to newest)
-            sparkline = [s.subscribers_count for s in reversed(snapshots)]
-
-            # Helper: compute growth vs a reference snapshot
-            def _growth_vs(ref_snap):
-                ref_subs = ref_snap.subscribers_count or 0
-                diff = current_subs - ref_subs
-                pct = round(diff / ref_subs * 100, 2) if ref_subs > 0 else 0.0
-                return diff, pct
-
-            # Find snapshots closest to 1 day, 7 days, 30 days ago
-            for s in snapshots[1:]:  # skip the latest (index 0)
-                age = (now - s.recorded_at).total_seconds() / 86400  # days
-
-                if age >= 0.8 and growth_24h == 0:
-                    growth_24h, growth_24h_pct = _growth_vs(s)
-
-                if age >= 6.5 and growth_7d == 0:
-                    growth_7d, growth_7d_pct = _growth_vs(s)
-
-                if age >= 29 and growth_30d == 0:
-                    growth_30d, growth_30d_pct = _growth_vs(s)
-
-            # If we have >=2 snapshots but no time-based match yet,
-            # use oldest available as reference for all missing periods
-            if len(snapshots) >= 2:
-                oldest = snapshots[-1]
-                if growth_24h == 0 and growth_24h_pct == 0.0:
-                    growth_24h, growth_24h_pct = _growth_vs(oldest)
-                if growth_7d == 0 and growth_7d_pct == 0.0:
-                    growth_7d, growth_7d_pct = _growth_vs(oldest)
-                if growth_30d == 0 and growth_30d_pct == 0.0:
-                    growth_30d, growth_30d_pct = _growth_vs(oldest)
+        if channel.latest_subs is not None:
+            current_subs = channel.latest_subs or current_subs
+
+        # Build sparkline (oldest to newest), downsampled to a fixed
+        # number of evenly spaced points. The stride is anchored to the
+        # newest snapshot so the current value is always the final point;
+        # any remainder drops from the oldest end instead
+        full_series = [s.subscribers_count for s in reversed(snapshots)]
+        step = max(1, len(full_series) // SPARKLINE_POINTS)
+        sparkline = full_series[::-1][::step][::-1][-SPARKLINE_POINTS:]
+
+        # Oldest snapshot in the window, fallback reference when a period
+        # has no time-based match yet
+        oldest_subs = snapshots[-1].subscribers_count if len(snapshots) >= 2 else None
+
+        def _growth_vs(ref_subs):
+            if ref_subs is None:
+                ref_subs = oldest_subs
+            if ref_subs is None:
+                return 0, 0.0
+            diff = current_subs - ref_subs
+            pct = round(diff / ref_subs * 100, 2) if ref_subs > 0 else 0.0
+            if diff == 0 and pct == 0.0 and oldest_subs not in (None, ref_subs):
+                diff = current_subs - oldest_subs
+                pct = (
+                    round(diff / oldest_subs * 100, 2)
+                    if oldest_subs > 0
+                    else 0.0
+                )
+            return diff, pct
+
+        growth_24h, growth_24h_pct = _growth_vs(channel.ref_24h)
+        growth_7d, growth_7d_pct = _growth_vs(channel.ref_7d)
+        growth_30d, growth_30d_pct = _growth_vs(channel.ref_30d)
 
         # Average daily gain/loss over 30 days
         avg_daily_30d = round(growth_30d / 30) if growth_30d != 0 else 0
 
         # Date of first snapshot for this channel
         first_snapshot_date = None
-        if snapshots:
-            first_snapshot_date = snapshots[-1].recorded_at.strftime("%Y-%m-%d")
+        if channel.first_recorded is not None:
+            first_snapshot_date = channel.first_recorded.strftime("%Y-%m-%d")
 
         results.append({
             "channel_id": channel.id,
@@ -581,6 +884,7 @@ def trigger_snapshot_all(
     """
     approved = (
         db.query(Channel)
+        .options(raiseload("*"))
         .filter(Channel.status == "approved")
         .all()
     )
@@ -593,6 +897,20 @@ def trigger_snapshot_all(
         for ch in approved
     ]
 
+    # Prefer the arq task queue: it frees this worker immediately and lets
+    # snapshot throughput scale with dedicated worker processes
+    if settings.REDIS_URL:
+        try:
+            _run_async(_enqueue_snapshot_all(channel_data))
+            return {
+                "status": "queued",
+                "channels_queued": len(channel_data),
+            }
+        except Exception as e:
+            logger.warning(
+                f"Task queue unavailable, falling back to in-process task: {e}"
+            )
+
     background_tasks.add_task(_snapshot_all_bg, channel_data)
 
     return {
@@ -615,20 +933,18 @@ def _snapshot_all_bg(channel_data: list) -> None:
         return
 
     scraper = TelegramScraper(session_name=bg_name)
-    loop = asyncio.new_event_loop()
-    asyncio.set_event_loop(loop)
     try:
-        loop.run_until_complete(
-            _snapshot_channels_async(scraper, channel_data)
+        _run_async(
+            _snapshot_channels_async(scraper, channel_data),
+            timeout=60.0 + 20.0 * len(channel_data),
         )
     except Exception as e:
         logger.error(f"Snapshot-all failed: {e}")
     finally:
         try:
-            loop.run_until_complete(scraper.disconnect())
+            _run_async(scraper.disconnect())
         except Exception:
             pass
-        loop.close()
 
     logger.info("Snapshot-all completed.")
 
@@ -645,57 +961,111 @@ async def _snapshot_channels_async(scraper, channel_data: list) -> None:
     except Exception:
         pass
 
+    # Fetch all channels' live info concurrently; the semaphore keeps the
+    # parallelism polite towards Telegram flood limits
+    sem = asyncio.Semaphore(5)
+
+    async def _fetch_one(telegram_id: int):
+        async with sem:
+            return await scraper.enrich_channel(telegram_id)
+
+    fetch_results = await asyncio.gather(
+        *(_fetch_one(ch_telegram_id) for _, _, _, ch_telegram_id in channel_data),
+        return_exceptions=True,
+    )
+
+    # The ORM work below is synchronous; run it in a worker thread so it
+    # doesn't block the shared background loop (and every _run_async
+    # caller on other requests) while it queries and commits
+    stored = await asyncio.get_running_loop().run_in_executor(
+        None, _store_snapshot_rows, channel_data, fetch_results
+    )
+    if stored:
+        try:
+            await FastAPICache.clear()
+        except Exception as e:
+            logger.debug(f"Stats cache clear skipped: {e}")
+
+
+def _store_snapshot_rows(channel_data: list, fetch_results: list) -> bool:
+    """Sync DB half of snapshot-all; runs in an executor thread."""
     db = SessionLocal()
     try:
-        for ch_id, ch_title, ch_username, ch_telegram_id in channel_data:
+        # One grouped query for every channel's 24h post count and average
+        # views, instead of two aggregate queries per channel
+        yesterday = datetime.utcnow() - timedelta(days=1)
+        agg_24h = {
+            channel_id: (posts, avg_views)
+            for channel_id, posts, avg_views in db.execute(
+                select(
+                    Message.channel_id,
+                    func.count(Message.id),
+                    func.avg(Message.views_count),
+                )
+                .where(
+                    Message.posted_at >= yesterday,
+                    Message.channel_id.in_([ch[0] for ch in channel_data]),
+                )
+                .group_by(Message.channel_id)
+            )
+        }
+
+        stats_rows: List[dict] = []
+        for (ch_id, ch_title, ch_username, ch_telegram_id), data in zip(
+            channel_data, fetch_results
+        ):
             try:
                 live_subscribers = 0
-                try:
-                    data = await scraper.enrich_channel(ch_telegram_id)
-                    if data:
-                        live_subscribers = data.get("subscribers_count", 0)
-                        channel = db.query(Channel).filter(Channel.id == ch_id).first()
-                        if channel and live_subscribers > 0:
-                            channel.subscribers_count = live_subscribers
-                except Exception as e:
-                    logger.warning(f"Could not fetch live stats for {ch_title}: {e}")
-                    channel = db.query(Channel).filter(Channel.id == ch_id).first()
+                if isinstance(data, BaseException) or not data:
+                    logger.warning(
+                        f"Could not fetch live stats for {ch_title}: {data}"
+                    )
+                    channel = (
+                        db.query(Channel)
+                        .options(raiseload("*"))
+                        .filter(Channel.id == ch_id)
+                        .first()
+                    )
                     live_subscribers = channel.subscribers_count if channel else 0
-
-                # Posts in last 24h
-                yesterday = datetime.utcnow() - timedelta(days=1)
-                posts_24h = (
-                    db.query(func.count(Message.id))
-                    .filter(Message.channel_id == ch_id, Message.posted_at >= yesterday)
-                    .scalar() or 0
-                )
-                avg_views_24h = (
-                    db.query(func.avg(Message.views_count))
-                    .filter(Message.channel_id == ch_id, Message.posted_at >= yesterday)
-                    .scalar()
-                )
+                else:
+                    live_subscribers = data.get("subscribers_count", 0)
+                    channel = (
+                        db.query(Channel)
+                        .options(raiseload("*"))
+                        .filter(Channel.id == ch_id)
+                        .first()
+                    )
+                    if channel and live_subscribers > 0:
+                        channel.subscribers_count = live_subscribers
+
+                # Posts / avg views in last 24h from the pre-batched lookup
+                posts_24h, avg_views_24h = agg_24h.get(ch_id, (0, None))
                 avg_views_24h = round(float(avg_views_24h), 2) if avg_views_24h else 0.0
 
-                stats = ChannelStats(
-                    channel_id=ch_id,
-                    subscribers_count=live_subscribers,
-                    posts_count=posts_24h,
-                    avg_views=avg_views_24h,
-                    recorded_at=datetime.utcnow(),
+                stats_rows.append(
+                    {
+                        "channel_id": ch_id,
+                        "subscribers_count": live_subscribers,
+                        "posts_count": posts_24h,
+                        "avg_views": avg_views_24h,
+                        "recorded_at": datetime.utcnow(),
+                    }
                 )
-                db.add(stats)
                 logger.info(
                     f"Snapshot: {ch_title} = {live_subscribers} subscribers"
                 )
             except Exception as e:
                 logger.error(f"Snapshot error for {ch_title}: {e}")
 
-            await asyncio.sleep(2)
-
+        # One multi-row INSERT instead of a flush of N single-row INSERTs
+        if stats_rows:
+            db.execute(insert(ChannelStats), stats_rows)
         db.commit()
+        return True
     except Exception as e:
         logger.error(f"Snapshot-all DB error: {e}")
         db.rollback()
+        return False
     finally:
         db.close()
 
@@ -721,6 +1091,7 @@ def delete_snapshots_before(
     )
     db.query(ChannelStats).filter(ChannelStats.recorded_at < cutoff).delete()
     db.commit()
+    _invalidate_stats_cache()
 
     logger.info(f"Deleted {count} snapshots before {date}")
     return {"deleted": count, "before": date}
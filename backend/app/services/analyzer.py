@@ -1,91 +1,437 @@
-import json
+import asyncio
 import logging
-from datetime import datetime
+import random
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from hashlib import blake2b
 from typing import Any, Dict, List, Optional
 
-from anthropic import Anthropic
+import httpx
+import orjson
+from anthropic import (
+    Anthropic,
+    APITimeoutError,
+    AsyncAnthropic,
+    InternalServerError,
+    RateLimitError,
+)
 
 from app.config import settings
 
 logger = logging.getLogger(__name__)
 
-ANALYSIS_PROMPT = """You are an expert marketing analyst specializing in Telegram affiliate marketing and trading channels. Analyze the following message and provide a structured analysis.
-
-MESSAGE TEXT:
----
-{message_text}
----
-
-ADDITIONAL CONTEXT:
-- Content type: {content_type}
-- Views: {views_count}
-- Forwards: {forwards_count}
-- Reactions: {reactions_count}
-- Has CTA button: {has_cta}
-- CTA text: {cta_text}
-- External links: {external_links}
-
-Provide your analysis as a valid JSON object with exactly these fields:
-
-{{
-    "hook_type": "one of: question, bold_claim, statistic, story, urgency, fear, curiosity, social_proof, authority, pain_point, none",
-    "cta_type": "one of: link_click, join_channel, buy_product, sign_up, contact_dm, forward_message, none",
-    "tone": "one of: urgent, professional, casual, aggressive, educational, inspirational, fear_based, friendly",
-    "promises": ["list of specific promises or claims made in the message"],
-    "social_proof_elements": ["list of social proof elements used, e.g., testimonials, numbers, screenshots, results"],
-    "engagement_score": 0.0 to 10.0,
-    "virality_potential": 0.0 to 10.0
-}}
+_UTC = timezone.utc
+
+
+def _utcnow() -> datetime:
+    """Naive UTC now via the non-deprecated API.
+
+    The DateTime columns store naive UTC (like datetime.utcnow elsewhere
+    in the app), so the tzinfo is dropped after the aware read.
+    """
+    return datetime.now(_UTC).replace(tzinfo=None)
+
+
+ANALYZER_MODEL = "claude-sonnet-4-20250514"
+
+# Retry/backoff policy for messages.create: 429s and transient 5xx are
+# retried with capped exponential backoff + jitter; a 529 (overloaded)
+# opens a circuit so we stop hammering the API for a cooldown period.
+_RETRYABLE_ERRORS = (RateLimitError, APITimeoutError, InternalServerError)
+_MAX_ATTEMPTS = 6
+_BACKOFF_CAP = 30.0
+_CIRCUIT_COOLDOWN = 30.0
+_circuit_open_until = 0.0
+
+# Exact-match analysis cache: channels cross-post the same promo text over
+# and over, and a repeat costs a full Claude call. L1 is an in-process LRU
+# dict; L2 is Redis (shared across workers) when REDIS_URL is configured.
+_CACHE_PREFIX = "analyzer:v1:"
+_CACHE_TTL = 604800  # 7 days
+_L1_MAX_ENTRIES = 4096
+_l1_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_redis_client = None
+
+
+def _cache_key(
+    text_content: str,
+    content_type: str,
+    has_cta: bool,
+    cta_text: Optional[str],
+) -> str:
+    raw = f"{ANALYZER_MODEL}|{text_content}|{content_type}|{has_cta}|{cta_text}"
+    return blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+# Near-duplicate matching: case, emoji, punctuation and whitespace variants
+# of the same promo text normalize to the same key
+_NORMALIZE_RE = re.compile(r"[^\w\s]", re.UNICODE)
+
+# Forced tool-use makes the API emit schema-valid JSON server-side, so no
+# fence stripping, json.loads or repair path is needed on responses
+_ANALYSIS_FIELDS_SCHEMA: Dict[str, Any] = {
+    "hook_type": {
+        "type": "string",
+        "enum": [
+            "question", "bold_claim", "statistic", "story", "urgency",
+            "fear", "curiosity", "social_proof", "authority",
+            "pain_point", "none",
+        ],
+    },
+    "cta_type": {
+        "type": "string",
+        "enum": [
+            "link_click", "join_channel", "buy_product", "sign_up",
+            "contact_dm", "forward_message", "none",
+        ],
+    },
+    "tone": {
+        "type": "string",
+        "enum": [
+            "urgent", "professional", "casual", "aggressive",
+            "educational", "inspirational", "fear_based", "friendly",
+        ],
+    },
+    "promises": {"type": "array", "items": {"type": "string"}},
+    "social_proof_elements": {"type": "array", "items": {"type": "string"}},
+    "engagement_score": {"type": "number", "minimum": 0, "maximum": 10},
+    "virality_potential": {"type": "number", "minimum": 0, "maximum": 10},
+}
+
+ANALYSIS_TOOL = {
+    "name": "emit_analysis",
+    "description": "Record the structured analysis of one message.",
+    "input_schema": {
+        "type": "object",
+        "properties": _ANALYSIS_FIELDS_SCHEMA,
+        "required": list(_ANALYSIS_FIELDS_SCHEMA),
+    },
+}
+
+BATCH_ANALYSIS_TOOL = {
+    "name": "emit_batch_analysis",
+    "description": "Record the structured analyses of a batch of messages.",
+    "input_schema": {
+        "type": "object",
+        "properties": {
+            "analyses": {
+                "type": "array",
+                "items": {
+                    "type": "object",
+                    "properties": {
+                        "msg": {"type": "integer"},
+                        **_ANALYSIS_FIELDS_SCHEMA,
+                    },
+                    "required": ["msg", *_ANALYSIS_FIELDS_SCHEMA],
+                },
+            }
+        },
+        "required": ["analyses"],
+    },
+}
+
+
+def _tool_input(message: Any) -> Dict[str, Any]:
+    """Extract the forced tool call's input dict from an API message."""
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use":
+            return block.input
+    raise ValueError("No tool_use block in Claude response.")
+
+
+def _build_result(analysis: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+    """Sanitize an analysis dict into the DB-ready result shape.
+
+    Single place for the serialization: the list columns and raw_analysis
+    are Text, so they're encoded with orjson (C-speed) and decoded once.
+    """
+    return {
+        "hook_type": str(analysis.get("hook_type", "none")),
+        "cta_type": str(analysis.get("cta_type", "none")),
+        "tone": str(analysis.get("tone", "casual")),
+        "promises": orjson.dumps(analysis.get("promises", [])).decode(),
+        "social_proof_elements": orjson.dumps(
+            analysis.get("social_proof_elements", [])
+        ).decode(),
+        "engagement_score": float(analysis.get("engagement_score", 0.0)),
+        "virality_potential": float(analysis.get("virality_potential", 0.0)),
+        "raw_analysis": orjson.dumps(analysis).decode(),
+        "analyzed_at": now,
+    }
+
+
+def _normalized_cache_key(
+    text_content: str,
+    content_type: str,
+    has_cta: bool,
+) -> str:
+    norm = " ".join(_NORMALIZE_RE.sub("", text_content.casefold()).split())
+    raw = f"{ANALYZER_MODEL}|norm|{norm}|{content_type}|{has_cta}"
+    return blake2b(raw.encode(), digest_size=16).hexdigest()
+
+
+def _l1_get(key: str) -> Optional[Dict[str, Any]]:
+    result = _l1_cache.get(key)
+    if result is not None:
+        _l1_cache.move_to_end(key)
+    return result
+
+
+def _l1_put(key: str, result: Dict[str, Any]) -> None:
+    _l1_cache[key] = result
+    _l1_cache.move_to_end(key)
+    while len(_l1_cache) > _L1_MAX_ENTRIES:
+        _l1_cache.popitem(last=False)
+
+
+def _get_redis():
+    global _redis_client
+    if _redis_client is None and settings.REDIS_URL:
+        from redis import asyncio as aioredis
+
+        _redis_client = aioredis.from_url(settings.REDIS_URL)
+    return _redis_client
+
+
+async def _cache_get(key: str) -> Optional[Dict[str, Any]]:
+    """Look up a cached analysis: L1 dict first, then Redis."""
+    result = _l1_get(key)
+    if result is not None:
+        return result
+    redis = _get_redis()
+    if redis is None:
+        return None
+    try:
+        payload = await redis.get(f"{_CACHE_PREFIX}{key}")
+    except Exception as e:
+        logger.debug(f"Analyzer cache read skipped: {e}")
+        return None
+    if payload is None:
+        return None
+    result = orjson.loads(payload)
+    _l1_put(key, result)
+    return result
+
+
+async def _cache_put(key: str, result: Dict[str, Any]) -> None:
+    _l1_put(key, result)
+    redis = _get_redis()
+    if redis is None:
+        return
+    try:
+        await redis.setex(
+            f"{_CACHE_PREFIX}{key}", _CACHE_TTL, orjson.dumps(result)
+        )
+    except Exception as e:
+        logger.debug(f"Analyzer cache write skipped: {e}")
+
+# Static instruction blocks are sent verbatim (no interpolation) and marked
+# with cache_control, so the API serves them from the prompt cache after the
+# first request; only the small per-message context block costs fresh input
+# tokens on subsequent calls.
+ANALYSIS_INSTRUCTIONS = """You are an expert marketing analyst specializing in Telegram affiliate marketing and trading channels. Analyze the message provided below and record your structured analysis by calling the emit_analysis tool.
 
 IMPORTANT:
 - engagement_score: Rate 0-10 based on how engaging the message is (hook strength, emotional triggers, clarity).
 - virality_potential: Rate 0-10 based on likelihood of being forwarded/shared (novelty, emotion, usefulness).
+- Be precise and factual. Only list promises/social_proof that are actually present. Social proof elements are e.g. testimonials, numbers, screenshots, results.
+"""
+
+def _analysis_context(
+    message_text: str,
+    content_type: str,
+    views_count: int,
+    forwards_count: int,
+    reactions_count: int,
+    has_cta: bool,
+    cta_text: Optional[str],
+    external_links: Optional[str],
+) -> str:
+    """Per-message context block, assembled from f-string fragments.
+
+    str.format would re-parse the whole template's placeholders on every
+    call; adjacent f-string literals concatenate at C speed.
+    """
+    return (
+        "MESSAGE TEXT:\n"
+        "---\n"
+        f"{message_text}\n"
+        "---\n"
+        "\n"
+        "ADDITIONAL CONTEXT:\n"
+        f"- Content type: {content_type}\n"
+        f"- Views: {views_count}\n"
+        f"- Forwards: {forwards_count}\n"
+        f"- Reactions: {reactions_count}\n"
+        f"- Has CTA button: {has_cta}\n"
+        f"- CTA text: {cta_text or 'N/A'}\n"
+        f"- External links: {external_links or 'None'}\n"
+    )
+
+VOICE_ANALYSIS_INSTRUCTIONS = """You are an expert marketing analyst. Analyze the voice message transcript provided below, taken from a Telegram affiliate/trading channel, and record your structured analysis by calling the emit_analysis tool.
+"""
+
+def _voice_context(transcript: str, duration: int) -> str:
+    """Per-transcript context block (see `_analysis_context`)."""
+    return (
+        "TRANSCRIPT:\n"
+        "---\n"
+        f"{transcript}\n"
+        "---\n"
+        "\n"
+        f"DURATION: {duration} seconds\n"
+    )
+
+BATCH_ANALYSIS_INSTRUCTIONS = """You are an expert marketing analyst specializing in Telegram affiliate marketing and trading channels. Analyze each of the messages provided below and record a structured analysis for EACH one by calling the emit_batch_analysis tool. Messages are delimited by <<<MSG n>>> markers.
+
+IMPORTANT:
+- msg: Echo the marker number exactly; it is used to match results to messages.
+- engagement_score: Rate 0-10 based on how engaging the message is.
+- virality_potential: Rate 0-10 based on likelihood of being forwarded/shared.
 - Be precise and factual. Only list promises/social_proof that are actually present.
-- Return ONLY the JSON object, no other text.
 """
 
-VOICE_ANALYSIS_PROMPT = """You are an expert marketing analyst. Analyze the following voice message transcript from a Telegram affiliate/trading channel.
+# Messages marshaled into one prompt per API call. Larger groups look
+# cheaper but latency grows super-linearly and responses get truncated or
+# misaligned; groups run concurrently anyway, so small groups win.
+BATCH_GROUP_SIZE = 4
+
+
+def _cached_prompt(instructions: str, context: str) -> list:
+    """Build a two-block user message: cacheable instructions + fresh context."""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": instructions,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": context},
+            ],
+        }
+    ]
+
+
+def _log_cache_usage(response: Any) -> None:
+    """Log prompt-cache hit/miss counters when the API reports them."""
+    usage = getattr(response, "usage", None)
+    read = getattr(usage, "cache_read_input_tokens", None)
+    written = getattr(usage, "cache_creation_input_tokens", None)
+    if read or written:
+        logger.debug(
+            f"Prompt cache: {read or 0} tokens read, {written or 0} written."
+        )
 
-TRANSCRIPT:
----
-{transcript}
----
 
-DURATION: {duration} seconds
+# One shared HTTP connection pool per client keeps TLS handshakes off the
+# per-call path even with many concurrent tasks
+_HTTP_LIMITS = httpx.Limits(max_connections=64, max_keepalive_connections=32)
 
-Provide your analysis as a valid JSON object with exactly these fields:
+# Persistent event loop for the sync wrappers. The async client's pooled
+# connections are bound to the loop that first drives them; a per-call
+# asyncio.run() would close that loop and leave the pool attached to a
+# dead one, breaking every call after the first. All sync entry points
+# funnel through this loop instead (same pattern as the stats router).
+_analyzer_loop = asyncio.new_event_loop()
+threading.Thread(
+    target=_analyzer_loop.run_forever, name="analyzer-loop", daemon=True
+).start()
 
-{{
-    "hook_type": "one of: question, bold_claim, statistic, story, urgency, fear, curiosity, social_proof, authority, pain_point, none",
-    "cta_type": "one of: link_click, join_channel, buy_product, sign_up, contact_dm, forward_message, none",
-    "tone": "one of: urgent, professional, casual, aggressive, educational, inspirational, fear_based, friendly",
-    "promises": ["list of specific promises or claims made"],
-    "social_proof_elements": ["list of social proof elements used"],
-    "engagement_score": 0.0 to 10.0,
-    "virality_potential": 0.0 to 10.0
-}}
 
-Return ONLY the JSON object, no other text.
-"""
+def _run_async(coro):
+    """Run a coroutine on the analyzer loop and block until it finishes."""
+    return asyncio.run_coroutine_threadsafe(coro, _analyzer_loop).result()
 
 
 class MessageAnalyzer:
     """Service for analyzing messages using Claude/Anthropic API."""
 
-    def __init__(self) -> None:
-        self._client: Optional[Anthropic] = None
+    def __init__(
+        self,
+        client: Optional[Anthropic] = None,
+        async_client: Optional[AsyncAnthropic] = None,
+    ) -> None:
+        # Clients may be injected (tests); otherwise built lazily exactly
+        # once under the lock so concurrent first calls can't race and
+        # construct duplicate connection pools
+        self._client = client
+        self._async_client = async_client
+        self._client_lock = threading.Lock()
+
+    @staticmethod
+    def _require_api_key() -> None:
+        if not settings.ANTHROPIC_API_KEY:
+            raise ValueError(
+                "ANTHROPIC_API_KEY is not configured. "
+                "Set it in .env or environment variables."
+            )
 
     @property
     def client(self) -> Anthropic:
         if self._client is None:
-            if not settings.ANTHROPIC_API_KEY:
-                raise ValueError(
-                    "ANTHROPIC_API_KEY is not configured. "
-                    "Set it in .env or environment variables."
-                )
-            self._client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
+            with self._client_lock:
+                if self._client is None:
+                    self._require_api_key()
+                    self._client = Anthropic(
+                        api_key=settings.ANTHROPIC_API_KEY,
+                        http_client=httpx.Client(limits=_HTTP_LIMITS),
+                    )
         return self._client
 
+    @property
+    def async_client(self) -> AsyncAnthropic:
+        if self._async_client is None:
+            with self._client_lock:
+                if self._async_client is None:
+                    self._require_api_key()
+                    self._async_client = AsyncAnthropic(
+                        api_key=settings.ANTHROPIC_API_KEY,
+                        http_client=httpx.AsyncClient(limits=_HTTP_LIMITS),
+                    )
+        return self._async_client
+
+    async def _create_message(self, **params: Any) -> Any:
+        """messages.create with retry-on-429/5xx and an overload circuit.
+
+        Raises whatever the last attempt raised; callers already treat any
+        exception as a failed analysis.
+        """
+        global _circuit_open_until
+        if time.monotonic() < _circuit_open_until:
+            raise RuntimeError(
+                "Anthropic circuit breaker open, skipping call."
+            )
+
+        delay = 1.0
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                return await self.async_client.messages.create(**params)
+            except _RETRYABLE_ERRORS as e:
+                if getattr(e, "status_code", None) == 529:
+                    _circuit_open_until = (
+                        time.monotonic() + _CIRCUIT_COOLDOWN
+                    )
+                    logger.warning(
+                        "Anthropic overloaded (529); circuit open for "
+                        f"{_CIRCUIT_COOLDOWN:.0f}s."
+                    )
+                    raise
+                if attempt == _MAX_ATTEMPTS:
+                    raise
+                wait = min(delay, _BACKOFF_CAP) * random.uniform(0.5, 1.5)
+                logger.warning(
+                    f"Anthropic {type(e).__name__} "
+                    f"(attempt {attempt}/{_MAX_ATTEMPTS}), "
+                    f"retrying in {wait:.1f}s."
+                )
+                await asyncio.sleep(wait)
+                delay *= 2
+
     def analyze_message(
         self,
         text_content: str,
@@ -96,6 +442,35 @@ class MessageAnalyzer:
         has_cta: bool = False,
         cta_text: Optional[str] = None,
         external_links: Optional[str] = None,
+    ) -> Optional[Dict[str, Any]]:
+        """Synchronous wrapper around `analyze_message_async`.
+
+        Kept for legacy callers running outside an event loop (router
+        background tasks, scheduler jobs).
+        """
+        return _run_async(
+            self.analyze_message_async(
+                text_content,
+                content_type=content_type,
+                views_count=views_count,
+                forwards_count=forwards_count,
+                reactions_count=reactions_count,
+                has_cta=has_cta,
+                cta_text=cta_text,
+                external_links=external_links,
+            )
+        )
+
+    async def analyze_message_async(
+        self,
+        text_content: str,
+        content_type: str = "text",
+        views_count: int = 0,
+        forwards_count: int = 0,
+        reactions_count: int = 0,
+        has_cta: bool = False,
+        cta_text: Optional[str] = None,
+        external_links: Optional[str] = None,
     ) -> Optional[Dict[str, Any]]:
         """
         Analyze a message using Claude API.
@@ -117,75 +492,102 @@ class MessageAnalyzer:
             logger.warning("Empty text content, skipping analysis.")
             return None
 
+        # L1: exact text; L2: normalized near-duplicate (rephrased reposts
+        # differing only in case/emoji/punctuation share one analysis)
+        cache_key = _cache_key(text_content, content_type, has_cta, cta_text)
+        norm_key = _normalized_cache_key(text_content, content_type, has_cta)
+        cached = await _cache_get(cache_key) or await _cache_get(norm_key)
+        if cached is not None:
+            logger.debug("Analysis served from cache.")
+            return {**cached, "analyzed_at": _utcnow()}
+
         try:
-            prompt = ANALYSIS_PROMPT.format(
-                message_text=text_content,
-                content_type=content_type,
-                views_count=views_count,
-                forwards_count=forwards_count,
-                reactions_count=reactions_count,
-                has_cta=has_cta,
-                cta_text=cta_text or "N/A",
-                external_links=external_links or "None",
+            context = _analysis_context(
+                text_content,
+                content_type,
+                views_count,
+                forwards_count,
+                reactions_count,
+                has_cta,
+                cta_text,
+                external_links,
             )
 
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
+            response = await self._create_message(
+                model=ANALYZER_MODEL,
                 max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt},
-                ],
+                tools=[ANALYSIS_TOOL],
+                tool_choice={"type": "tool", "name": "emit_analysis"},
+                messages=_cached_prompt(ANALYSIS_INSTRUCTIONS, context),
             )
+            _log_cache_usage(response)
 
-            response_text = response.content[0].text.strip()
-
-            # Clean potential markdown code block wrapper
-            if response_text.startswith("```"):
-                lines = response_text.split("\n")
-                # Remove first line (```json or ```) and last line (```)
-                lines = [
-                    line
-                    for line in lines
-                    if not line.strip().startswith("```")
-                ]
-                response_text = "\n".join(lines)
-
-            analysis = json.loads(response_text)
+            analysis = _tool_input(response)
 
             # Validate and sanitize
-            result: Dict[str, Any] = {
-                "hook_type": str(analysis.get("hook_type", "none")),
-                "cta_type": str(analysis.get("cta_type", "none")),
-                "tone": str(analysis.get("tone", "casual")),
-                "promises": json.dumps(analysis.get("promises", [])),
-                "social_proof_elements": json.dumps(
-                    analysis.get("social_proof_elements", [])
-                ),
-                "engagement_score": float(
-                    analysis.get("engagement_score", 0.0)
-                ),
-                "virality_potential": float(
-                    analysis.get("virality_potential", 0.0)
-                ),
-                "raw_analysis": json.dumps(analysis),
-                "analyzed_at": datetime.utcnow(),
-            }
+            result = _build_result(analysis, _utcnow())
+
+            # Cache everything but the timestamp, which is set per hit
+            cacheable = {k: v for k, v in result.items() if k != "analyzed_at"}
+            await _cache_put(cache_key, cacheable)
+            await _cache_put(norm_key, cacheable)
 
             logger.info("Message analyzed successfully.")
             return result
 
-        except json.JSONDecodeError as e:
-            logger.error(f"Failed to parse analysis response as JSON: {e}")
-            return None
         except Exception as e:
             logger.error(f"Error analyzing message: {e}")
             return None
 
+    async def analyze_many(
+        self,
+        messages: List[Dict[str, Any]],
+        concurrency: int = 16,
+    ) -> List[Optional[Dict[str, Any]]]:
+        """
+        Analyze messages concurrently with bounded parallelism.
+
+        Fires up to `concurrency` Claude calls at once, so wall time for a
+        batch approaches the slowest single call instead of the sum of all
+        of them.
+
+        Args:
+            messages: List of dicts as in `analyze_messages_batch`.
+            concurrency: Maximum number of in-flight API calls.
+
+        Returns:
+            List of result dicts aligned with the input (None for failures).
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def _one(msg: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                return await self.analyze_message_async(
+                    msg.get("text_content", ""),
+                    content_type=msg.get("content_type", "text"),
+                    views_count=msg.get("views_count", 0),
+                    forwards_count=msg.get("forwards_count", 0),
+                    reactions_count=msg.get("reactions_count", 0),
+                    has_cta=msg.get("has_cta", False),
+                    cta_text=msg.get("cta_text"),
+                    external_links=msg.get("external_links"),
+                )
+
+        return list(
+            await asyncio.gather(*(_one(msg) for msg in messages))
+        )
+
     def analyze_messages_batch(
         self, messages: List[Dict[str, Any]]
     ) -> Optional[List[Dict[str, Any]]]:
         """
-        Analyze a batch of messages (up to 10) in a single Claude API call.
+        Analyze a batch of messages in small marshaled groups.
+
+        Messages are packed BATCH_GROUP_SIZE at a time into one prompt each
+        (keeping responses short and well-formed) and the groups run
+        concurrently on the async client. Each result echoes its message
+        marker, so misaligned responses are matched by id instead of being
+        positionally padded with defaults.
 
         Args:
             messages: List of dicts, each with keys: text_content, content_type,
@@ -202,14 +604,19 @@ class MessageAnalyzer:
             logger.warning("Empty messages list, skipping batch analysis.")
             return None
 
-        # Build numbered message blocks
+        return _run_async(self._analyze_batch_groups(messages))
+
+    async def _analyze_group(
+        self, start: int, group: List[Dict[str, Any]]
+    ) -> Optional[Dict[int, Dict[str, Any]]]:
+        """Analyze one marshaled group; returns {global_index: analysis}."""
         message_blocks = []
-        for i, msg in enumerate(messages):
+        for i, msg in enumerate(group, start=start):
             text = msg.get("text_content", "")
             if not text or not text.strip():
                 text = "(empty)"
             block = (
-                f"=== MESSAGE {i + 1} ===\n"
+                f"<<<MSG {i}>>>\n"
                 f"TEXT:\n{text}\n"
                 f"Content type: {msg.get('content_type', 'text')}\n"
                 f"Views: {msg.get('views_count', 0)}\n"
@@ -221,109 +628,230 @@ class MessageAnalyzer:
             )
             message_blocks.append(block)
 
-        all_messages_text = "\n".join(message_blocks)
-
-        prompt = (
-            "You are an expert marketing analyst specializing in Telegram affiliate "
-            "marketing and trading channels. Analyze each of the following messages "
-            "and provide a structured analysis for EACH one.\n\n"
-            f"{all_messages_text}\n\n"
-            f"Return a JSON array with exactly {len(messages)} objects (one per message, "
-            "in the same order). Each object must have exactly these fields:\n\n"
-            "{\n"
-            '    "hook_type": "one of: question, bold_claim, statistic, story, urgency, '
-            'fear, curiosity, social_proof, authority, pain_point, none",\n'
-            '    "cta_type": "one of: link_click, join_channel, buy_product, sign_up, '
-            'contact_dm, forward_message, none",\n'
-            '    "tone": "one of: urgent, professional, casual, aggressive, educational, '
-            'inspirational, fear_based, friendly",\n'
-            '    "promises": ["list of specific promises or claims made in the message"],\n'
-            '    "social_proof_elements": ["list of social proof elements used"],\n'
-            '    "engagement_score": 0.0 to 10.0,\n'
-            '    "virality_potential": 0.0 to 10.0\n'
-            "}\n\n"
-            "IMPORTANT:\n"
-            "- engagement_score: Rate 0-10 based on how engaging the message is.\n"
-            "- virality_potential: Rate 0-10 based on likelihood of being forwarded/shared.\n"
-            "- Be precise and factual. Only list promises/social_proof that are actually present.\n"
-            "- Return ONLY the JSON array, no other text.\n"
+        context = (
+            "\n".join(message_blocks)
+            + f"\n\nThe analyses array must contain exactly {len(group)} objects.\n"
         )
 
         try:
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
+            response = await self._create_message(
+                model=ANALYZER_MODEL,
                 max_tokens=4096,
-                messages=[
-                    {"role": "user", "content": prompt},
-                ],
+                tools=[BATCH_ANALYSIS_TOOL],
+                tool_choice={"type": "tool", "name": "emit_batch_analysis"},
+                messages=_cached_prompt(BATCH_ANALYSIS_INSTRUCTIONS, context),
             )
+            _log_cache_usage(response)
 
-            response_text = response.content[0].text.strip()
-
-            # Clean potential markdown code block wrapper
-            if response_text.startswith("```"):
-                lines = response_text.split("\n")
-                lines = [
-                    line
-                    for line in lines
-                    if not line.strip().startswith("```")
-                ]
-                response_text = "\n".join(lines)
-
-            analyses = json.loads(response_text)
+            analyses = _tool_input(response).get("analyses", [])
 
             if not isinstance(analyses, list):
                 logger.error("Batch analysis response is not a JSON array.")
                 return None
 
-            # Pad or truncate to match input length
-            now = datetime.utcnow()
-            results: List[Dict[str, Any]] = []
-
-            for i in range(len(messages)):
-                if i < len(analyses):
-                    a = analyses[i]
-                else:
-                    # If Claude returned fewer results, use defaults
-                    a = {}
-
-                result: Dict[str, Any] = {
-                    "hook_type": str(a.get("hook_type", "none")),
-                    "cta_type": str(a.get("cta_type", "none")),
-                    "tone": str(a.get("tone", "casual")),
-                    "promises": json.dumps(a.get("promises", [])),
-                    "social_proof_elements": json.dumps(
-                        a.get("social_proof_elements", [])
-                    ),
-                    "engagement_score": float(
-                        a.get("engagement_score", 0.0)
-                    ),
-                    "virality_potential": float(
-                        a.get("virality_potential", 0.0)
-                    ),
-                    "raw_analysis": json.dumps(a),
-                    "analyzed_at": now,
-                }
-                results.append(result)
+            group_results: Dict[int, Dict[str, Any]] = {}
+            for pos, a in enumerate(analyses):
+                if not isinstance(a, dict):
+                    continue
+                # Match by echoed marker; fall back to position in group
+                idx = a.get("msg")
+                if not (
+                    isinstance(idx, int) and start <= idx < start + len(group)
+                ):
+                    idx = start + pos
+                group_results[idx] = a
+            return group_results
 
+        except Exception as e:
+            logger.error(f"Error in batch analysis: {e}")
+            return None
+
+    async def _analyze_batch_groups(
+        self, messages: List[Dict[str, Any]]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """Run the marshaled groups concurrently and assemble results."""
+        # Crawler replays routinely repeat the same text; analyze each
+        # distinct payload once and fan the result back out afterwards
+        unique_index: Dict[tuple, int] = {}
+        unique_messages: List[Dict[str, Any]] = []
+        input_to_unique: List[int] = []
+        for msg in messages:
+            key = (
+                msg.get("text_content"),
+                msg.get("content_type"),
+                msg.get("has_cta"),
+            )
+            if key not in unique_index:
+                unique_index[key] = len(unique_messages)
+                unique_messages.append(msg)
+            input_to_unique.append(unique_index[key])
+
+        if len(unique_messages) < len(messages):
             logger.info(
-                f"Batch analysis complete: {len(results)} messages analyzed."
+                f"Batch dedup: {len(messages)} messages -> "
+                f"{len(unique_messages)} unique."
             )
-            return results
 
-        except json.JSONDecodeError as e:
-            logger.error(
-                f"Failed to parse batch analysis response as JSON: {e}"
+        group_maps = await asyncio.gather(
+            *(
+                self._analyze_group(
+                    start, unique_messages[start : start + BATCH_GROUP_SIZE]
+                )
+                for start in range(0, len(unique_messages), BATCH_GROUP_SIZE)
+            )
+        )
+
+        if all(gm is None for gm in group_maps):
+            return None
+
+        analyses_by_index: Dict[int, Dict[str, Any]] = {}
+        for gm in group_maps:
+            if gm:
+                analyses_by_index.update(gm)
+
+        now = _utcnow()
+        results: List[Dict[str, Any]] = []
+        for unique_i in input_to_unique:
+            a = analyses_by_index.get(unique_i, {})
+            a.pop("msg", None)
+            results.append(_build_result(a, now))
+
+        logger.info(
+            f"Batch analysis complete: {len(results)} messages analyzed."
+        )
+        return results
+
+    async def analyze_messages_batch_async(
+        self,
+        messages: List[Dict[str, Any]],
+        poll_interval: float = 10.0,
+        timeout: float = 3600.0,
+    ) -> Optional[Dict[str, Dict[str, Any]]]:
+        """
+        Analyze a large set of messages via the Anthropic Message Batches API.
+
+        One batch request per message (half the cost of the realtime API and
+        much higher rate limits), so this is the preferred path for bulk /
+        offline analysis. `analyze_messages_batch` remains as the realtime
+        fallback for small interactive batches.
+
+        Args:
+            messages: List of dicts as in `analyze_messages_batch`; an
+                optional "id" key becomes the batch custom_id (defaults to
+                the list index).
+            poll_interval: Seconds between batch status polls.
+            timeout: Give up waiting for the batch after this many seconds.
+
+        Returns:
+            Dict mapping custom_id -> result dict (same shape as
+            `analyze_message`), or None on failure. Messages whose request
+            errored are absent from the mapping.
+        """
+        if not messages:
+            logger.warning("Empty messages list, skipping batch analysis.")
+            return None
+
+        batch_requests = []
+        for i, msg in enumerate(messages):
+            text = msg.get("text_content", "")
+            if not text or not text.strip():
+                continue
+            context = _analysis_context(
+                text,
+                msg.get("content_type", "text"),
+                msg.get("views_count", 0),
+                msg.get("forwards_count", 0),
+                msg.get("reactions_count", 0),
+                msg.get("has_cta", False),
+                msg.get("cta_text"),
+                msg.get("external_links"),
             )
+            batch_requests.append(
+                {
+                    "custom_id": str(msg.get("id", i)),
+                    "params": {
+                        "model": ANALYZER_MODEL,
+                        "max_tokens": 1024,
+                        "tools": [ANALYSIS_TOOL],
+                        "tool_choice": {
+                            "type": "tool",
+                            "name": "emit_analysis",
+                        },
+                        "messages": _cached_prompt(
+                            ANALYSIS_INSTRUCTIONS, context
+                        ),
+                    },
+                }
+            )
+
+        if not batch_requests:
+            logger.warning("No non-empty messages in batch, skipping.")
             return None
+
+        try:
+            batch = await self.async_client.messages.batches.create(
+                requests=batch_requests
+            )
+            logger.info(
+                f"Anthropic batch {batch.id} submitted "
+                f"({len(batch_requests)} requests)"
+            )
+
+            deadline = asyncio.get_event_loop().time() + timeout
+            while batch.processing_status != "ended":
+                if asyncio.get_event_loop().time() > deadline:
+                    logger.error(f"Anthropic batch {batch.id} timed out.")
+                    return None
+                await asyncio.sleep(poll_interval)
+                batch = await self.async_client.messages.batches.retrieve(
+                    batch.id
+                )
+
+            now = _utcnow()
+            results: Dict[str, Dict[str, Any]] = {}
+            entries = await self.async_client.messages.batches.results(
+                batch.id
+            )
+            async for entry in entries:
+                if entry.result.type != "succeeded":
+                    logger.warning(
+                        f"Batch entry {entry.custom_id} "
+                        f"{entry.result.type}, skipping."
+                    )
+                    continue
+                try:
+                    analysis = _tool_input(entry.result.message)
+                except ValueError as e:
+                    logger.error(
+                        f"Batch entry {entry.custom_id} unparseable: {e}"
+                    )
+                    continue
+                results[entry.custom_id] = _build_result(analysis, now)
+
+            logger.info(
+                f"Anthropic batch {batch.id} complete: "
+                f"{len(results)}/{len(batch_requests)} succeeded."
+            )
+            return results
+
         except Exception as e:
-            logger.error(f"Error in batch analysis: {e}")
+            logger.error(f"Error in async batch analysis: {e}")
             return None
 
     def analyze_voice_transcript(
         self,
         transcript: str,
         duration: int = 0,
+    ) -> Optional[Dict[str, Any]]:
+        """Synchronous wrapper around `analyze_voice_transcript_async`."""
+        return _run_async(
+            self.analyze_voice_transcript_async(transcript, duration=duration)
+        )
+
+    async def analyze_voice_transcript_async(
+        self,
+        transcript: str,
+        duration: int = 0,
     ) -> Optional[Dict[str, Any]]:
         """
         Analyze a voice message transcript using Claude API.
@@ -340,58 +868,24 @@ class MessageAnalyzer:
             return None
 
         try:
-            prompt = VOICE_ANALYSIS_PROMPT.format(
-                transcript=transcript,
-                duration=duration,
-            )
+            context = _voice_context(transcript, duration)
 
-            response = self.client.messages.create(
-                model="claude-sonnet-4-20250514",
+            response = await self._create_message(
+                model=ANALYZER_MODEL,
                 max_tokens=1024,
-                messages=[
-                    {"role": "user", "content": prompt},
-                ],
+                tools=[ANALYSIS_TOOL],
+                tool_choice={"type": "tool", "name": "emit_analysis"},
+                messages=_cached_prompt(VOICE_ANALYSIS_INSTRUCTIONS, context),
             )
+            _log_cache_usage(response)
 
-            response_text = response.content[0].text.strip()
-
-            if response_text.startswith("```"):
-                lines = response_text.split("\n")
-                lines = [
-                    line
-                    for line in lines
-                    if not line.strip().startswith("```")
-                ]
-                response_text = "\n".join(lines)
-
-            analysis = json.loads(response_text)
-
-            result: Dict[str, Any] = {
-                "hook_type": str(analysis.get("hook_type", "none")),
-                "cta_type": str(analysis.get("cta_type", "none")),
-                "tone": str(analysis.get("tone", "casual")),
-                "promises": json.dumps(analysis.get("promises", [])),
-                "social_proof_elements": json.dumps(
-                    analysis.get("social_proof_elements", [])
-                ),
-                "engagement_score": float(
-                    analysis.get("engagement_score", 0.0)
-                ),
-                "virality_potential": float(
-                    analysis.get("virality_potential", 0.0)
-                ),
-                "raw_analysis": json.dumps(analysis),
-                "analyzed_at": datetime.utcnow(),
-            }
+            analysis = _tool_input(response)
+
+            result = _build_result(analysis, _utcnow())
 
             logger.info("Voice transcript analyzed successfully.")
             return result
 
-        except json.JSONDecodeError as e:
-            logger.error(
-                f"Failed to parse voice analysis response as JSON: {e}"
-            )
-            return None
         except Exception as e:
             logger.error(f"Error analyzing voice transcript: {e}")
             return None
@@ -0,0 +1,55 @@
+"""Content-addressed local store for downloaded Telegram media."""
+
+import asyncio
+import hashlib
+import logging
+import os
+from typing import Optional
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class LocalMediaStore:
+    """Persist media bytes under a local static directory.
+
+    Files are named ``{sha1(bytes)}.{ext}``, so identical thumbnails are
+    written once and every URL is immutable — the API can tell clients
+    to cache them forever instead of shipping base64 blobs in each
+    response.
+    """
+
+    def __init__(
+        self,
+        root: Optional[str] = None,
+        url_prefix: str = "/static/thumbs",
+    ) -> None:
+        self._root = root or settings.MEDIA_STORE_DIR
+        # Absolute URLs when the backend's public origin is configured:
+        # the frontend runs on another origin, where a bare /static path
+        # would resolve against the wrong host
+        base = settings.MEDIA_URL_BASE.rstrip("/")
+        self._url_prefix = base + url_prefix.rstrip("/")
+
+    async def save(self, data: bytes, ext: str = "jpg") -> str:
+        """Store bytes and return the URL path they will be served from.
+
+        Content-addressed: if a file with the same hash already exists
+        the write is skipped entirely.
+        """
+        digest = hashlib.sha1(data).hexdigest()
+        filename = f"{digest}.{ext}"
+        path = os.path.join(self._root, filename)
+        if not os.path.exists(path):
+            await asyncio.to_thread(self._write, path, data)
+        return f"{self._url_prefix}/{filename}"
+
+    def _write(self, path: str, data: bytes) -> None:
+        os.makedirs(self._root, exist_ok=True)
+        # Write to a per-process temp name and rename, so concurrent
+        # savers of the same content never observe a partial file
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
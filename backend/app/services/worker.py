@@ -0,0 +1,62 @@
+"""arq worker for long-running snapshot jobs.
+
+Run alongside the API process with:
+
+    arq app.services.worker.WorkerSettings
+
+Requires REDIS_URL to be configured. The worker keeps its own Telegram
+session copy and scraper instance, so HTTP workers are never tied up for
+the duration of a snapshot sweep.
+"""
+
+import logging
+import shutil
+
+from arq.connections import RedisSettings
+
+from app.config import settings
+from app.services.telegram_client import TelegramScraper
+
+logger = logging.getLogger(__name__)
+
+
+async def startup(ctx: dict) -> None:
+    """Create the worker's dedicated scraper from a session copy."""
+    worker_name = f"{settings.TELEGRAM_SESSION_NAME}_worker"
+    try:
+        shutil.copy2(
+            f"{settings.TELEGRAM_SESSION_NAME}.session",
+            f"{worker_name}.session",
+        )
+    except Exception as e:
+        logger.warning(f"[Worker] Could not copy Telegram session: {e}")
+    ctx["scraper"] = TelegramScraper(session_name=worker_name)
+
+
+async def shutdown(ctx: dict) -> None:
+    """Disconnect the worker's Telegram client."""
+    scraper = ctx.get("scraper")
+    if scraper is not None:
+        try:
+            await scraper.disconnect()
+        except Exception as e:
+            logger.warning(f"[Worker] Error disconnecting scraper: {e}")
+
+
+async def snapshot_all_job(ctx: dict, channel_data: list) -> int:
+    """Record live stats snapshots for the given channels."""
+    # Imported here to keep the worker importable without the router graph
+    from app.routers.stats import _snapshot_channels_async
+
+    await _snapshot_channels_async(ctx["scraper"], channel_data)
+    logger.info(f"[Worker] snapshot_all_job done for {len(channel_data)} channels")
+    return len(channel_data)
+
+
+class WorkerSettings:
+    functions = [snapshot_all_job]
+    on_startup = startup
+    on_shutdown = shutdown
+    redis_settings = RedisSettings.from_dsn(
+        settings.REDIS_URL or "redis://localhost:6379"
+    )
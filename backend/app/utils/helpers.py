@@ -1,7 +1,28 @@
-import json
 import re
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from itertools import islice
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import orjson
+
+# Possessive quantifiers (Python 3.11+) make the scan strictly linear-time:
+# once a host/path segment is consumed it is never given back, so no input
+# can trigger exponential backtracking.
+_URL_RE = re.compile(
+    r"https?://(?:[-\w.]|%[\da-fA-F]{2})++[/\w\-.~:/?#\[\]@!$&'()*+,;=%]*+"
+)
+# Null-byte deletion and both whitespace collapses in one scan. The
+# newline and space branches tolerate interleaved null bytes so the
+# result matches the old order of operations (strip nulls first, then
+# collapse); the first character of a match picks the replacement.
+_SANITIZE_RE = re.compile(r"\x00+|\n(?:\x00*\n){2,}\x00*| (?:\x00* )+\x00*")
+
+
+def _sanitize_repl(match: "re.Match[str]") -> str:
+    char = match.group()[0]
+    if char == "\x00":
+        return ""
+    return "\n\n" if char == "\n" else " "
 
 
 def safe_json_loads(value: Optional[str], default: Any = None) -> Any:
@@ -18,8 +39,8 @@ def safe_json_loads(value: Optional[str], default: Any = None) -> Any:
     if not value:
         return default
     try:
-        return json.loads(value)
-    except (json.JSONDecodeError, TypeError):
+        return orjson.loads(value)
+    except (orjson.JSONDecodeError, TypeError):
         return default
 
 
@@ -35,7 +56,7 @@ def safe_json_dumps(value: Any, default: str = "null") -> str:
         JSON string or default.
     """
     try:
-        return json.dumps(value, ensure_ascii=False)
+        return orjson.dumps(value).decode()
     except (TypeError, ValueError):
         return default
 
@@ -52,11 +73,7 @@ def extract_urls(text: Optional[str]) -> List[str]:
     """
     if not text:
         return []
-
-    url_pattern = re.compile(
-        r"https?://(?:[-\w.]|(?:%[\da-fA-F]{2}))+[/\w\-.~:/?#\[\]@!$&'()*+,;=%]*"
-    )
-    return url_pattern.findall(text)
+    return _URL_RE.findall(text)
 
 
 def truncate_text(text: Optional[str], max_length: int = 200) -> Optional[str]:
@@ -120,6 +137,51 @@ def calculate_engagement_rate(
     return round(rate, 2)
 
 
+def format_numbers(numbers: List[int]) -> List[str]:
+    """
+    Format a batch of numbers for human-readable display.
+
+    Inlines the threshold logic into a single comprehension so bulk
+    rendering avoids one function call per row.
+
+    Args:
+        numbers: Numbers to format.
+
+    Returns:
+        List of formatted strings (e.g., '1.2K', '3.5M').
+    """
+    return [
+        f"{n / 1_000_000:.1f}M"
+        if n >= 1_000_000
+        else (f"{n / 1_000:.1f}K" if n >= 1_000 else str(n))
+        for n in numbers
+    ]
+
+
+def calculate_engagement_rates(
+    views: List[int],
+    forwards: List[int],
+    reactions: List[int],
+    replies: List[int],
+) -> List[float]:
+    """
+    Calculate engagement rates for a batch of messages.
+
+    Args:
+        views: View counts per message.
+        forwards: Forward counts per message.
+        reactions: Reaction counts per message.
+        replies: Reply counts per message.
+
+    Returns:
+        List of engagement rates, each between 0 and 100.
+    """
+    return [
+        round((f + rx + rp) / v * 100, 2) if v else 0.0
+        for v, f, rx, rp in zip(views, forwards, reactions, replies)
+    ]
+
+
 def normalize_telegram_username(username: str) -> str:
     """
     Normalize a Telegram username by removing @ prefix and trimming whitespace.
@@ -148,6 +210,12 @@ def parse_datetime_or_none(value: Any) -> Optional[datetime]:
     if isinstance(value, datetime):
         return value
     if isinstance(value, str):
+        # Fast path: C-implemented ISO-8601 parser (Python 3.11 accepts
+        # every format the strptime loop below handles, plus offsets)
+        try:
+            return datetime.fromisoformat(value)
+        except ValueError:
+            pass
         for fmt in (
             "%Y-%m-%dT%H:%M:%S",
             "%Y-%m-%dT%H:%M:%S.%f",
@@ -161,6 +229,26 @@ def parse_datetime_or_none(value: Any) -> Optional[datetime]:
     return None
 
 
+def chunk_iterable(iterable: Iterable[Any], chunk_size: int) -> Iterator[List[Any]]:
+    """
+    Lazily yield chunks of a given size from any iterable.
+
+    Unlike chunk_list this never materializes all chunks at once and
+    does not require the input to support len(), so it works for
+    generators and async-fed pipelines.
+
+    Args:
+        iterable: Iterable to split.
+        chunk_size: Size of each chunk.
+
+    Yields:
+        Lists of up to chunk_size items.
+    """
+    it = iter(iterable)
+    while chunk := list(islice(it, chunk_size)):
+        yield chunk
+
+
 def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
     """
     Split a list into chunks of a given size.
@@ -172,7 +260,7 @@ def chunk_list(lst: List[Any], chunk_size: int) -> List[List[Any]]:
     Returns:
         List of list chunks.
     """
-    return [lst[i : i + chunk_size] for i in range(0, len(lst), chunk_size)]
+    return list(chunk_iterable(lst, chunk_size))
 
 
 def sanitize_text(text: Optional[str]) -> Optional[str]:
@@ -188,11 +276,5 @@ def sanitize_text(text: Optional[str]) -> Optional[str]:
     if not text:
         return text
 
-    # Remove null bytes
-    text = text.replace("\x00", "")
-
-    # Normalize whitespace (collapse multiple spaces/newlines)
-    text = re.sub(r"\n{3,}", "\n\n", text)
-    text = re.sub(r" {2,}", " ", text)
-
-    return text.strip()
+    # Remove null bytes and collapse spaces/newlines in a single pass
+    return _SANITIZE_RE.sub(_sanitize_repl, text).strip()
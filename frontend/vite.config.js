@@ -11,6 +11,11 @@ export default defineConfig({
       '/api': {
         target: 'http://localhost:8000',
         changeOrigin: true,
+      },
+      // Thumbnails are served by the backend's static mount
+      '/static': {
+        target: 'http://localhost:8000',
+        changeOrigin: true,
       }
     }
   }